@@ -75,7 +75,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            # SQLite can't ALTER most things; autogenerate batch (copy-and-move) operations for it
+            render_as_batch=connection.dialect.name == "sqlite",
         )
 
         with context.begin_transaction():
@@ -0,0 +1,46 @@
+"""Add usage rollups
+
+Revision ID: 3f1c2b7d9e4a
+Revises: a53f9298f5da
+Create Date: 2026-10-19 09:12:44.201117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2b7d9e4a'
+down_revision = 'a53f9298f5da'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('usage_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('participant_seconds', sa.BigInteger(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('day', 'room_id', 'user_id')
+    )
+    op.create_index('ix_usage_rollups_room_id_day', 'usage_rollups', ['room_id', 'day'], unique=False)
+    op.create_index('ix_usage_rollups_user_id_day', 'usage_rollups', ['user_id', 'day'], unique=False)
+    op.create_table('rollup_watermarks',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('high_water_mark', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index('ix_room_participants_left_at_id', 'room_participants', ['left_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_room_participants_left_at_id', table_name='room_participants')
+    op.drop_table('rollup_watermarks')
+    op.drop_index('ix_usage_rollups_user_id_day', table_name='usage_rollups')
+    op.drop_index('ix_usage_rollups_room_id_day', table_name='usage_rollups')
+    op.drop_table('usage_rollups')
@@ -0,0 +1,29 @@
+"""Add rate limit buckets
+
+Revision ID: 5b8d2f6a9c14
+Revises: e41a7c9b3d25
+Create Date: 2026-10-19 15:21:08.337162
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8d2f6a9c14'
+down_revision = 'e41a7c9b3d25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,24 @@
+"""Add user is_admin flag
+
+Revision ID: 8d4e6a1f2c3b
+Revises: 3f1c2b7d9e4a
+Create Date: 2026-10-19 10:02:17.554903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4e6a1f2c3b'
+down_revision = '3f1c2b7d9e4a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('is_admin', sa.Boolean(), server_default=sa.false(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'is_admin')
@@ -0,0 +1,32 @@
+"""Add rooms search index
+
+Revision ID: b6f0d3e8a217
+Revises: 9a3e6d1c7f52
+Create Date: 2026-10-19 17:32:10.418266
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f0d3e8a217'
+down_revision = '9a3e6d1c7f52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Full-text search is PostgreSQL only; other databases search by scanning
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.create_index('ix_rooms_search', 'rooms', [sa.text(
+        "(setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B'))"
+    )], unique=False, postgresql_using='gin', postgresql_where=sa.text('is_active'))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_rooms_search', table_name='rooms')
@@ -0,0 +1,24 @@
+"""Add room_participants room_id/user_id index
+
+Revision ID: c7b2e9d41f08
+Revises: 8d4e6a1f2c3b
+Create Date: 2026-10-19 11:26:41.208317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7b2e9d41f08'
+down_revision = '8d4e6a1f2c3b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_room_participants_room_id_user_id', 'room_participants', ['room_id', 'user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_room_participants_room_id_user_id', table_name='room_participants')
@@ -0,0 +1,24 @@
+"""Add revoked_tokens revoked_at index
+
+Revision ID: d3a8f1c6b290
+Revises: b6f0d3e8a217
+Create Date: 2026-10-19 19:04:52.611730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8f1c6b290'
+down_revision = 'b6f0d3e8a217'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_revoked_tokens_revoked_at', 'revoked_tokens', ['revoked_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_revoked_tokens_revoked_at', table_name='revoked_tokens')
@@ -0,0 +1,221 @@
+"""Admission control for the bcrypt endpoints (/auth/login, /auth/register).
+
+Each bcrypt hash or verify burns a core for tens of milliseconds, so a
+credential-stuffing burst or a reconnect storm can take every CPU and starve
+the room endpoints. Two layers keep that in check:
+
+1. Token buckets per client IP and per username reject abusive clients with
+   429 before any database or bcrypt work. Buckets live in the worker; with
+   RATE_LIMIT_SHARED they are also enforced across workers through the
+   ``rate_limit_buckets`` table (the local bucket still rejects first, so an
+   abusive client costs no database writes).
+2. An adaptive concurrency limit on password hashing per worker, starting at
+   PASSWORD_HASH_MAX_CONCURRENCY (default 4 per CPU). Every hash reports its
+   latency; while the smoothed latency stays within
+   PASSWORD_HASH_LATENCY_TOLERANCE times the fastest seen, the limit grows by
+   about one per limit's worth of requests, and once hashing slows down (the
+   CPUs are saturated) it shrinks by 10%. Requests over the limit get 503
+   with Retry-After instead of queueing behind bcrypt.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import case, literal
+from sqlalchemy.exc import DBAPIError
+from .config import settings
+from .database import SessionLocal, dialect_insert
+from .metrics import ADMISSION_REJECTIONS, PASSWORD_HASH_CONCURRENCY_LIMIT
+from .models import RateLimitBucket
+from .system import available_cpus
+
+# Idle buckets are dropped once a worker tracks more keys than this
+MAX_TRACKED_KEYS = 100000
+
+
+class TokenBucket:
+    """Token buckets keyed by client IP or username (rate per minute, burst tokens)."""
+
+    def __init__(self, name: str, rate_per_minute: float, burst: int):
+        self.name = name
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str) -> Optional[float]:
+        """Take one token; returns None when allowed, else seconds until a token is available."""
+        if self.rate <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > MAX_TRACKED_KEYS:
+                self._prune(now)
+        return None
+
+    def _prune(self, now: float) -> None:
+        """Drop buckets that have refilled completely (they behave like new ones)."""
+        full_after = self.burst / self.rate
+        for key, (_, updated) in list(self._buckets.items()):
+            if now - updated >= full_after:
+                del self._buckets[key]
+
+    def take_shared(self, key: str) -> Optional[float]:
+        """Take one token from this key's row in rate_limit_buckets (one upsert)."""
+        if self.rate <= 0:
+            return None
+        now = time.time()
+        refilled = RateLimitBucket.tokens + (literal(now) - RateLimitBucket.updated_at) * self.rate
+        capped = case((refilled > self.burst, float(self.burst)), else_=refilled)
+        db = SessionLocal()
+        try:
+            stmt = dialect_insert(db)(RateLimitBucket).values(key=f"{self.name}:{key}", tokens=self.burst - 1, updated_at=now)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"],
+                set_={"tokens": capped - 1, "updated_at": now},
+                where=capped >= 1,
+            ).returning(RateLimitBucket.tokens)
+            allowed = db.execute(stmt).first() is not None
+            db.commit()
+        except DBAPIError as e:
+            # Fail open: the worker's own bucket already applied
+            print(f"Rate limit note: {str(e)}")
+            return None
+        finally:
+            db.close()
+        return None if allowed else 1 / self.rate
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for password hashing, adapted to observed hash latency."""
+
+    def __init__(self, max_limit: int, tolerance: float, smoothing: float = 0.2, drift: float = 0.01):
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.drift = drift
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.min_latency = math.inf
+        self.latency: Optional[float] = None
+        self._lock = threading.Lock()
+        PASSWORD_HASH_CONCURRENCY_LIMIT.set(self.limit)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe(self, seconds: float) -> None:
+        """Adjust the limit after one hash took this long."""
+        with self._lock:
+            if self.latency is None:
+                self.latency = seconds
+            else:
+                self.latency += self.smoothing * (seconds - self.latency)
+            # The baseline slowly drifts back up to the smoothed latency, so a
+            # lasting slowdown (a busier host, a higher bcrypt cost) becomes the
+            # new normal instead of pinning the limit at 1
+            if self.min_latency < self.latency:
+                self.min_latency += self.drift * (self.latency - self.min_latency)
+            self.min_latency = min(self.min_latency, seconds)
+            if self.latency > self.min_latency * self.tolerance:
+                self.limit = max(1.0, self.limit * 0.9)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            PASSWORD_HASH_CONCURRENCY_LIMIT.set(self.limit)
+
+
+@lru_cache
+def _buckets() -> Dict[str, TokenBucket]:
+    return {
+        "login_ip": TokenBucket("login_ip", settings.login_rate_per_ip, settings.login_burst_per_ip),
+        "login_username": TokenBucket(
+            "login_username", settings.login_rate_per_username, settings.login_burst_per_username
+        ),
+        "register_ip": TokenBucket("register_ip", settings.register_rate_per_ip, settings.register_burst_per_ip),
+    }
+
+
+@lru_cache
+def password_hash_limiter() -> AdaptiveLimiter:
+    """This worker's adaptive limit on concurrent password hashing."""
+    return AdaptiveLimiter(
+        settings.password_hash_max_concurrency or 4 * available_cpus(),
+        settings.password_hash_latency_tolerance,
+    )
+
+
+def _check(endpoint: str, bucket_name: str, key: str) -> None:
+    bucket = _buckets()[bucket_name]
+    retry_after = bucket.take(key)
+    if retry_after is None and settings.rate_limit_shared:
+        retry_after = bucket.take_shared(key)
+    if retry_after is not None:
+        ADMISSION_REJECTIONS.inc(endpoint, bucket_name)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many attempts, try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+@contextmanager
+def _hashing_slot(endpoint: str):
+    limiter = password_hash_limiter()
+    if not limiter.try_acquire():
+        ADMISSION_REJECTIONS.inc(endpoint, "overload")
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        yield
+    finally:
+        limiter.release()
+
+
+def admit_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """Dependency: rate-limit a login by IP and username, then take a hashing slot."""
+    _check("login", "login_ip", request.client.host if request.client else "")
+    _check("login", "login_username", form_data.username.lower())
+    with _hashing_slot("login"):
+        yield
+
+
+def admit_register(request: Request):
+    """Dependency: rate-limit registration by IP, then take a hashing slot."""
+    _check("register", "register_ip", request.client.host if request.client else "")
+    with _hashing_slot("register"):
+        yield
+
+
+def purge_rate_limit_buckets_job() -> None:
+    """Delete shared buckets that have been idle long enough to be full again."""
+    refill_seconds = [bucket.burst / bucket.rate for bucket in _buckets().values() if bucket.rate > 0]
+    db = SessionLocal()
+    try:
+        db.query(RateLimitBucket).filter(
+            RateLimitBucket.updated_at < time.time() - max(refill_seconds, default=0)
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
@@ -1,3 +1,6 @@
+import math
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -8,6 +11,10 @@ from sqlalchemy.orm import Session
 from .database import get_db
 from .models import User
 from .config import settings
+from .admission import password_hash_limiter
+from .revocation import revocations
+from .metrics import PASSWORD_HASH_SECONDS, TOKEN_MINT_SECONDS
+from .tracing import start_span
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -18,37 +25,56 @@ security = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    start = time.perf_counter()
+    with PASSWORD_HASH_SECONDS.time("verify"), start_span("auth.verify_password"):
+        verified = pwd_context.verify(plain_password, hashed_password)
+    password_hash_limiter().observe(time.perf_counter() - start)
+    return verified
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
+    start = time.perf_counter()
+    with PASSWORD_HASH_SECONDS.time("hash"), start_span("auth.hash_password"):
+        hashed = pwd_context.hash(password)
+    password_hash_limiter().observe(time.perf_counter() - start)
+    return hashed
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create a JWT access token."""
+    """Create a JWT access token.
+
+    data should hold "sub" (username) and "uid" (user id); a token id (jti)
+    and issue time are added so the token can be revoked.
+    """
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    to_encode.update({"exp": expire, "iat": int(time.time()), "jti": uuid.uuid4().hex})
+    with TOKEN_MINT_SECONDS.time("access"), start_span("auth.create_access_token"):
+        encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify a JWT token and return the username."""
+def decode_token(token: str) -> Optional[dict]:
+    """Verify a JWT token and return its claims."""
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
+        with start_span("auth.verify_token"):
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
     except JWTError:
         return None
+    if payload.get("sub") is None:
+        return None
+    return payload
+
+
+def verify_token(token: str) -> Optional[str]:
+    """Verify a JWT token and return the username."""
+    payload = decode_token(token)
+    return payload["sub"] if payload is not None else None
 
 
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
@@ -61,31 +87,90 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     return user
 
 
-def get_current_user(
+class Principal:
+    """The authenticated user as described by their access token."""
+
+    __slots__ = ("id", "username", "jti", "expires_at")
+
+    def __init__(self, id: int, username: str, jti: Optional[str], expires_at: int):
+        self.id = id
+        self.username = username
+        self.jti = jti
+        self.expires_at = expires_at
+
+
+def get_current_principal(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user."""
+) -> Principal:
+    """Get the current authenticated user from the token alone.
+
+    Revoked tokens (logout, deactivated users) are rejected by the in-memory
+    revocation list, so this reads no database row. Tokens issued before
+    tokens carried a user id fall back to looking the user up, and are
+    checked against the revocation list as well.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token = credentials.credentials
-    username = verify_token(token)
-    if username is None:
+    payload = decode_token(credentials.credentials)
+    if payload is None:
         raise credentials_exception
+    username = payload["sub"]
+    if not revocations.loaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token revocations are not loaded yet",
+            headers={"Retry-After": str(math.ceil(settings.token_revocation_refresh_seconds))},
+        )
     
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    user_id = payload.get("uid")
+    if user_id is None:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise credentials_exception
+        if not user.is_active:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        user_id = user.id
+    if revocations.is_revoked(payload.get("jti"), user_id, payload.get("iat", 0)):
         raise credentials_exception
     
-    return user
+    # Lets get_read_db send this user's reads to the primary after their writes
+    db.info["username"] = username
+    return Principal(user_id, username, payload.get("jti"), payload["exp"])
+
 
+def get_current_active_user(principal: Principal = Depends(get_current_principal)) -> Principal:
+    """Get the current active user (id and username, without a database read).
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
-    """Get the current active user."""
-    if not current_user.is_active:
+    Deactivating a user revokes their tokens and inactive users cannot log
+    in, so a valid token belongs to an active user.
+    """
+    return principal
+
+
+def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get the current user's row, for routes that need more than id and username."""
+    user = db.query(User).filter(User.id == principal.id).first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
+
+def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """Get the current user, requiring admin rights."""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
     return current_user
@@ -0,0 +1,16 @@
+import asyncio
+from typing import Callable
+from fastapi.concurrency import run_in_threadpool
+
+
+async def run_periodic(
+    name: str, interval_seconds: float, job: Callable[[], None], initial_delay_seconds: float = 0.0
+) -> None:
+    """Run a blocking job in the threadpool every interval until cancelled."""
+    await asyncio.sleep(initial_delay_seconds)
+    while True:
+        try:
+            await run_in_threadpool(job)
+        except Exception as e:
+            print(f"{name} job note: {str(e)}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,246 @@
+import argparse
+import csv
+import io
+import json
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, TextIO
+import bcrypt
+from pydantic import ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import SessionLocal, dialect_insert
+from .models import User
+from .schemas import UserCreate
+
+# Rows validated, hashed and loaded per transaction
+IMPORT_BATCH_SIZE = 1000
+
+REQUIRED_COLUMNS = {"username", "email", "password"}
+
+_hash_pool: Optional["ProcessPoolExecutor"] = None
+
+
+def _hash_password(password: str) -> str:
+    """bcrypt hash in the format passlib verifies, for the worker processes.
+
+    Plain bcrypt on purpose: the workers have no metrics, tracing or
+    admission limiter, and importing them there would be wasted work.
+    """
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+def _get_hash_pool() -> "ProcessPoolExecutor":
+    """Create the bcrypt process pool on first use.
+
+    Workers are spawned rather than forked: a fork of the server would copy
+    its event loop, threads and pooled database connections into each child.
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        # Imported here: multiprocessing is only needed once an import runs
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=settings.bulk_import_hash_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+    """Stop the bcrypt worker processes, if they were started."""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+
+def _hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash passwords in parallel across the process pool."""
+    if not passwords:
+        return []
+    chunksize = max(1, len(passwords) // (settings.bulk_import_hash_workers * 4))
+    return list(_get_hash_pool().map(_hash_password, passwords, chunksize=chunksize))
+
+
+def _batches(iterable: Iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _copy_users(db: Session, rows: List[Dict]) -> set:
+    """Load rows with COPY into a temp table, then insert what doesn't conflict.
+
+    Needs psycopg2 (copy_expert); import_users_csv only uses it with that driver.
+
+    Returns the usernames that were actually inserted, so rows that lost a
+    race with a concurrent registration can be reported.
+    """
+    db.execute(text(
+        "CREATE TEMP TABLE users_import "
+        "(username varchar(50), email varchar(100), full_name varchar(100), hashed_password varchar(255)) "
+        "ON COMMIT DROP"
+    ))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row["username"], row["email"], row["full_name"], row["hashed_password"]])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY users_import (username, email, full_name, hashed_password) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+    inserted = db.execute(text(
+        "INSERT INTO users (username, email, full_name, hashed_password, is_active) "
+        "SELECT username, email, full_name, hashed_password, true FROM users_import "
+        "ON CONFLICT DO NOTHING RETURNING username"
+    )).scalars().all()
+    return set(inserted)
+
+
+def _insert_users(db: Session, rows: List[Dict]) -> set:
+    """Load rows with a multi-row INSERT where COPY isn't available.
+
+    Like _copy_users, rows that conflict with an existing user are skipped
+    and only the inserted usernames are returned.
+    """
+    inserted = db.execute(
+        dialect_insert(db)(User)
+        .values([dict(row, is_active=True) for row in rows])
+        .on_conflict_do_nothing()
+        .returning(User.username)
+    ).scalars().all()
+    return set(inserted)
+
+
+def import_users_csv(db: Session, stream: TextIO, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """Create users from a CSV stream with username, email, password and optional full_name.
+
+    Rows are processed in batches: validated, checked for duplicates against
+    the file and the users table with one query per column, hashed in
+    parallel, then loaded in a single statement. Returns the number created
+    and a per-row error report (row numbers match the file, header is row 1).
+    """
+    reader = csv.DictReader(stream)
+    missing = REQUIRED_COLUMNS - set(reader.fieldnames or [])
+    if missing:
+        return {
+            "created": 0,
+            "errors": [{"row": 1, "error": f"Missing columns: {', '.join(sorted(missing))}"}],
+        }
+
+    use_copy = db.get_bind().url.get_driver_name() == "psycopg2"
+    seen_emails: set = set()
+    seen_usernames: set = set()
+    errors: List[Dict] = []
+    created = 0
+
+    for batch in _batches(enumerate(reader, start=2), batch_size):
+        candidates = []
+        for row_number, raw in batch:
+            try:
+                user = UserCreate(
+                    username=(raw.get("username") or "").strip(),
+                    email=(raw.get("email") or "").strip(),
+                    password=raw.get("password") or "",
+                    full_name=(raw.get("full_name") or "").strip() or None,
+                )
+            except ValidationError as e:
+                first = e.errors()[0]
+                field = ".".join(str(part) for part in first["loc"])
+                errors.append({"row": row_number, "error": f"{field}: {first['msg']}"})
+                continue
+
+            if not user.username or not user.password:
+                errors.append({"row": row_number, "username": user.username, "error": "Username and password are required"})
+                continue
+            if user.email in seen_emails:
+                errors.append({"row": row_number, "username": user.username, "error": "Duplicate email in file"})
+                continue
+            if user.username in seen_usernames:
+                errors.append({"row": row_number, "username": user.username, "error": "Duplicate username in file"})
+                continue
+            seen_emails.add(user.email)
+            seen_usernames.add(user.username)
+            candidates.append((row_number, user))
+
+        if not candidates:
+            continue
+
+        taken_emails = set(db.scalars(select(User.email).where(
+            User.email.in_([user.email for _, user in candidates])
+        )))
+        taken_usernames = set(db.scalars(select(User.username).where(
+            User.username.in_([user.username for _, user in candidates])
+        )))
+
+        accepted = []
+        for row_number, user in candidates:
+            if user.email in taken_emails:
+                errors.append({"row": row_number, "username": user.username, "error": "Email already registered"})
+            elif user.username in taken_usernames:
+                errors.append({"row": row_number, "username": user.username, "error": "Username already taken"})
+            else:
+                accepted.append((row_number, user))
+
+        if not accepted:
+            continue
+
+        hashes = _hash_passwords([user.password for _, user in accepted])
+        rows = [
+            {
+                "username": user.username,
+                "email": user.email,
+                "full_name": user.full_name,
+                "hashed_password": hashed_password,
+            }
+            for (_, user), hashed_password in zip(accepted, hashes)
+        ]
+
+        try:
+            inserted = _copy_users(db, rows) if use_copy else _insert_users(db, rows)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            inserted = set()
+
+        for row_number, user in accepted:
+            if user.username not in inserted:
+                errors.append({"row": row_number, "username": user.username, "error": "Conflicts with a concurrently created user"})
+        created += len(inserted)
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": created, "errors": errors}
+
+
+def main() -> None:
+    """Import users from a CSV file: python -m app.bulk_import users.csv"""
+    parser = argparse.ArgumentParser(description="Bulk-create users from a CSV file.")
+    parser.add_argument("path", help="CSV with username, email, password and optional full_name columns")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        with open(args.path, newline="", encoding="utf-8") as f:
+            report = import_users_csv(db, f, batch_size=args.batch_size)
+    finally:
+        db.close()
+        shutdown_hash_pool()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -5,24 +6,133 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     database_url: str
+    # Optional read replica for GET routes; reads fall back to the primary
+    database_read_url: Optional[str] = None
+    # After a user's own write, their reads go to the primary for this long
+    read_your_writes_seconds: float = 5.0
+    # How long to skip an unreachable replica before trying it again
+    read_replica_retry_seconds: float = 30.0
+    # Connection pool (per worker process, per engine)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Open db_pool_size connections at startup instead of on first requests
+    db_pool_prewarm: bool = True
+    # Set when connecting through PgBouncer in transaction pooling mode
+    db_pgbouncer: bool = False
     
     # JWT
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # How often each worker loads new token revocations from the database
+    token_revocation_refresh_seconds: float = 2.0
     
     # LiveKit
     livekit_url: str
     livekit_api_key: str
     livekit_api_secret: str
+    # Each RPC gets at most this long, and no more than is left of the
+    # request's budget (REQUEST_BUDGET_SECONDS, counted from arrival)
+    livekit_rpc_timeout_seconds: float = 3.0
+    request_budget_seconds: float = 10.0
+    # Per-method circuit breaker: fail fast after this many consecutive
+    # failures, then probe again after the reset time
+    livekit_circuit_failures: int = 5
+    livekit_circuit_reset_seconds: float = 10.0
+    # List calls may fall back to an answer this old when LiveKit is failing
+    livekit_stale_seconds: float = 60.0
+    # Send a second ListRooms/ListParticipants request when the first is
+    # slower than this (0 disables hedging)
+    livekit_hedge_after_ms: float = 0.0
     
     # Server
     host: str = "0.0.0.0"
     port: int = 8000
-    debug: bool = True
+    debug: bool = False
+    # Production server (python -m app.server); workers default to available CPUs
+    web_concurrency: Optional[int] = None
+    backlog: int = 2048
+    # Longer than common load balancer idle timeouts (60s) so they close first
+    keep_alive_seconds: int = 75
+    graceful_shutdown_seconds: int = 30
+    forwarded_allow_ips: str = "127.0.0.1"
+    access_log: bool = False
+
+    # Observability
+    metrics_enabled: bool = True
+    # Tracing is enabled when an export path and/or OTLP endpoint is set
+    tracing_sample_rate: float = 0.0
+    tracing_export_path: Optional[str] = None
+    # The export file is rotated to <path>.1 (replacing it) at this size
+    tracing_export_max_bytes: int = 100 * 1024 * 1024
+    tracing_otlp_endpoint: Optional[str] = None
+    # Clients (comma-separated IPs or CIDRs, "*" for any) whose sampled
+    # traceparent forces tracing; others only propagate their trace id
+    tracing_trusted_parents: str = ""
+    # Profiling is enabled when a token (sent as X-Profile) or sample rate is set
+    profiler_token: Optional[str] = None
+    profiler_sample_rate: float = 0.0
+    profiler_interval_ms: float = 1.0
+    profiler_dir: str = "profiles"
+    profiler_max_files: int = 100
+
+    # Compare the database's Alembic revision with the migration head at
+    # startup: "off", "warn" (print a note) or "fail" (refuse to start)
+    schema_check: str = "warn"
+
+    # Admission control for /auth/login and /auth/register: token buckets
+    # (requests per minute, burst size; a rate of 0 disables the bucket)
+    login_rate_per_ip: float = 30
+    login_burst_per_ip: int = 10
+    login_rate_per_username: float = 10
+    login_burst_per_username: int = 5
+    register_rate_per_ip: float = 10
+    register_burst_per_ip: int = 5
+    # Share the buckets across workers through the database
+    rate_limit_shared: bool = False
+    # Adaptive limit on concurrent bcrypt work per worker (default 4 per CPU);
+    # it shrinks while hashing is slower than tolerance x the recent fastest
+    password_hash_max_concurrency: Optional[int] = None
+    password_hash_latency_tolerance: float = 2.0
+    # Processes hashing passwords for bulk imports (on top of the server's
+    # own workers, so keep it below the CPU count)
+    bulk_import_hash_workers: int = 2
+
+    # Idempotency-Key: how long completed responses are replayed, and how
+    # many are kept in memory per worker in front of the table
+    idempotency_ttl_seconds: int = 86400
+    idempotency_cache_size: int = 10000
+
+    # Idle rooms: close rooms nobody has been connected to for this long,
+    # this many per UPDATE, and delete them from LiveKit this many at a time
+    room_idle_seconds: int = 86400
+    room_close_batch_size: int = 500
+    livekit_delete_concurrency: int = 4
+
+    # Background jobs (0 disables the job)
+    usage_rollup_interval_seconds: int = 60
+    idempotency_purge_interval_seconds: int = 300
+    rate_limit_purge_interval_seconds: int = 300
+    room_close_interval_seconds: int = 300
 
     class Config:
         env_file = ".env"
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Settings read from the environment on first use."""
+    return Settings()
+
+
+class _LazySettings:
+    """Forwards attribute access to get_settings(), so importing reads no environment."""
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+
+settings = _LazySettings()
@@ -1,18 +1,283 @@
-from sqlalchemy import create_engine
+import asyncio
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
 from .config import settings
+from .metrics import DB_POOL_CHECKOUT_WAIT_SECONDS, instrument_engine
+from .tracing import trace_engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT_SECONDS.observe(time.perf_counter() - start, self.logging_name or "primary")
+
+
+class SharedConnectionPool(StaticPool):
+    """StaticPool that lends its one connection to one checkout at a time.
+
+    An in-memory SQLite database exists only inside its connection, so every
+    session has to share it; the lock keeps sessions on different threads
+    (requests, background jobs) from interleaving their transactions. A
+    session holds the connection until it commits or closes, so one that is
+    opened while another is still holding it waits up to DB_POOL_TIMEOUT.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checkout_lock = threading.Lock()
+
+    def _do_get(self):
+        if not self._checkout_lock.acquire(timeout=settings.db_pool_timeout):
+            raise PoolTimeoutError(f"Shared connection not returned within {settings.db_pool_timeout}s")
+        try:
+            return super()._do_get()
+        except BaseException:
+            self._checkout_lock.release()
+            raise
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._checkout_lock.release()
+
+    def dispose(self):
+        # Let a session still using the connection (e.g. a job at shutdown) finish first
+        acquired = self._checkout_lock.acquire(timeout=settings.db_pool_timeout)
+        try:
+            super().dispose()
+        finally:
+            if acquired:
+                self._checkout_lock.release()
+
+
+def _pgbouncer_connect_args(driver: str) -> dict:
+    """Driver options that keep server-side prepared statements off.
+
+    PgBouncer in transaction mode hands each transaction a possibly different
+    server connection, so a statement prepared on one is missing on the next.
+    psycopg2 and pg8000 never create named server-side prepared statements;
+    psycopg 3 does after prepare_threshold executions unless it is disabled.
+    """
+    if driver == "psycopg":
+        return {"prepare_threshold": None}
+    return {}
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    """Whether url names an in-memory SQLite database ("sqlite://", ":memory:" or mode=memory)."""
+    parsed = make_url(url)
+    return parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory"
+
+
+def _sqlite_on_connect(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # Enforce foreign keys like PostgreSQL does, and wait for locks instead of failing
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def _create_engine(url: str, pool_name: str):
+    engine_options = {}
+    sqlite = url.startswith("sqlite")
+    if sqlite:
+        # Sessions are used from the threadpool, not only the thread that connected
+        engine_options["connect_args"] = {"check_same_thread": False}
+        if _is_sqlite_memory(url):
+            # Every new connection would open a new, empty database: share one
+            engine_options["poolclass"] = SharedConnectionPool
+    else:
+        engine_options.update(
+            poolclass=TimedQueuePool,
+            pool_logging_name=pool_name,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+        if settings.db_pgbouncer:
+            engine_options["connect_args"] = _pgbouncer_connect_args(make_url(url).get_driver_name())
+    engine = create_engine(url, **engine_options)
+    if sqlite:
+        event.listen(engine, "connect", _sqlite_on_connect)
+    instrument_engine(engine, pool_name)
+    trace_engine(engine)
+    return engine
+
+
+_engines: Dict[str, Optional[Engine]] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """The primary engine, created on first use rather than at import."""
+    engine = _engines.get("primary")
+    if engine is None:
+        with _engines_lock:
+            if "primary" not in _engines:
+                _engines["primary"] = _create_engine(settings.database_url, "primary")
+            engine = _engines["primary"]
+    return engine
+
+
+def get_read_engine() -> Optional[Engine]:
+    """The read replica engine, or None when DATABASE_READ_URL is unset."""
+    if "replica" not in _engines:
+        with _engines_lock:
+            if "replica" not in _engines:
+                url = settings.database_read_url
+                _engines["replica"] = _create_engine(url, "replica") if url else None
+    return _engines["replica"]
+
+
+def __getattr__(name: str):
+    # Keeps `from app.database import engine` working without an import-time engine
+    if name == "engine":
+        return get_engine()
+    if name == "read_engine":
+        return get_read_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class AppSession(Session):
+    """Session bound to the primary engine when it is first used."""
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.bind is None:
+            self.bind = get_engine()
+        return super().get_bind(mapper, clause=clause, **kwargs)
 
-# Create SQLAlchemy engine
-engine = create_engine(settings.database_url)
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=AppSession, autocommit=False, autoflush=False)
 
 # Create Base class
 Base = declarative_base()
 
 
+def create_schema() -> None:
+    """Create missing tables straight from the models.
+
+    For development databases and harnesses only; deployments are migrated
+    with `alembic upgrade head` and the app never creates tables itself.
+    """
+    from . import models  # noqa: F401 (registers the tables on Base.metadata)
+    Base.metadata.create_all(bind=get_engine())
+
+
+def memory_database() -> bool:
+    """Whether the primary database is in-memory SQLite (per process, gone on exit)."""
+    engine = get_engine()
+    return engine.dialect.name == "sqlite" and _is_sqlite_memory(engine.url.render_as_string())
+
+
+def use_database(url: str = "sqlite://") -> Engine:
+    """Point the app at another database and create its schema there (tests, benchmarks).
+
+    The default, a fresh in-memory SQLite database, takes a few milliseconds
+    to build; call this again for an empty one. Reads go to the same database.
+    """
+    dispose_engines()
+    with _engines_lock:
+        _engines.clear()
+        _engines["primary"] = engine = _create_engine(url, "primary")
+        _engines["replica"] = None
+    create_schema()
+    return engine
+
+
+def check_schema_version(strict: bool = False) -> None:
+    """Compare the database's Alembic revision with the migration scripts' head."""
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    heads = set(ScriptDirectory.from_config(Config(ALEMBIC_INI)).get_heads())
+    try:
+        with get_engine().connect() as connection:
+            current = set(MigrationContext.configure(connection).get_current_heads())
+    except DBAPIError as e:
+        if strict:
+            raise
+        print(f"Schema check note: {str(e)}")
+        return
+    if current != heads:
+        message = (
+            f"database is at revision {', '.join(sorted(current)) or '(none)'}, "
+            f"migrations are at {', '.join(sorted(heads))}; run `alembic upgrade head`"
+        )
+        if strict:
+            raise RuntimeError(f"Schema check failed: {message}")
+        print(f"Schema check note: {message}")
+
+
+def dialect_insert(db: Session):
+    """The dialect's INSERT construct (supports ON CONFLICT)."""
+    # Imported here: the dialect packages are loaded with the engine anyway
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+async def prewarm_pools() -> None:
+    """Open db_pool_size connections per engine so early requests skip connection setup."""
+    for pool_engine in (get_engine(), get_read_engine()):
+        if pool_engine is None or pool_engine.dialect.name == "sqlite":
+            continue
+        # Hold them all at once, otherwise the pool hands back the same connection
+        opening = asyncio.gather(
+            *(run_in_threadpool(pool_engine.connect) for _ in range(settings.db_pool_size)),
+            return_exceptions=True,
+        )
+        try:
+            connections = await asyncio.wait_for(asyncio.shield(opening), settings.db_pool_timeout)
+        except asyncio.TimeoutError:
+            print("Pool prewarm note: timed out opening connections")
+            # The threads keep connecting; return what they open once they finish
+            opening.add_done_callback(lambda opened: _close_all(opened.result()))
+            continue
+        errors = _close_all(connections)
+        if errors:
+            print(f"Pool prewarm note: {len(errors)} of {len(connections)} connections failed: {str(errors[0])}")
+
+
+def _close_all(connections: list) -> list:
+    """Return the opened connections to their pool; returns the errors among them."""
+    errors = [connection for connection in connections if isinstance(connection, Exception)]
+    for connection in connections:
+        if not isinstance(connection, Exception):
+            connection.close()
+    return errors
+
+
+def dispose_engines() -> None:
+    """Close every pooled connection (called on shutdown)."""
+    for pool_engine in _engines.values():
+        if pool_engine is not None:
+            pool_engine.dispose()
+
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -20,3 +285,153 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def release_session(db: Session) -> None:
+    """End a request session's transaction and hand its connection back to the pool.
+
+    Async routes call this (from the threadpool) before awaiting slow I/O such
+    as LiveKit, so the connection isn't held idle across the await. The session
+    can still be used afterwards; it checks a connection out again.
+    """
+    db.close()
+    primary = getattr(db, "primary", None)
+    if primary is not None:
+        primary.close()
+
+
+# Read-your-writes: username -> monotonic time until which reads go to the primary
+_recent_writers: Dict[str, float] = {}
+# The current request's read-your-writes marker: {"until": unix time, "wrote": bool}
+_request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+READ_YOUR_WRITES_COOKIE = "rw_until"
+# Monotonic time until which the replica is skipped after a connection failure
+_replica_down_until = 0.0
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _note_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _note_commit(session):
+    if not session.info.pop("wrote", False):
+        return
+    marker = _request_writes.get()
+    if marker is not None:
+        marker["until"] = time.time() + settings.read_your_writes_seconds
+        marker["wrote"] = True
+    username = session.info.get("username")
+    if username:
+        now = time.monotonic()
+        _recent_writers[username] = now + settings.read_your_writes_seconds
+        if len(_recent_writers) > 10000:
+            for name, until in list(_recent_writers.items()):
+                if until < now:
+                    _recent_writers.pop(name, None)
+
+
+def _wrote_recently(username) -> bool:
+    marker = _request_writes.get()
+    if marker is not None and marker["until"] > time.time():
+        return True
+    return username is not None and _recent_writers.get(username, 0.0) > time.monotonic()
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware carrying the read-your-writes marker with the client.
+
+    A response to a request that committed a write sets the rw_until cookie to
+    the time until which that client's reads go to the primary, so a client
+    that sends it back reads its own writes whichever worker serves it next.
+    A client that drops cookies falls back to the per-worker record of its
+    user's writes: its reads on other workers may go to a replica that has
+    not caught up yet. Does nothing without a replica.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or get_read_engine() is None:
+            await self.app(scope, receive, send)
+            return
+
+        marker = {"until": _cookie_until(scope), "wrote": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and marker["wrote"]:
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={marker['until']:.3f}; "
+                    f"Max-Age={math.ceil(settings.read_your_writes_seconds)}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = dict(message, headers=[*message.get("headers", []), (b"set-cookie", cookie.encode())])
+            await send(message)
+
+        token = _request_writes.set(marker)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_writes.reset(token)
+
+
+def _cookie_until(scope) -> float:
+    for name, value in scope["headers"]:
+        if name != b"cookie":
+            continue
+        for part in value.decode("latin-1").split(";"):
+            key, _, until = part.strip().partition("=")
+            if key == READ_YOUR_WRITES_COOKIE:
+                try:
+                    # A forged value can only send the client's own reads to the primary
+                    return min(float(until), time.time() + settings.read_your_writes_seconds)
+                except ValueError:
+                    return 0.0
+    return 0.0
+
+
+class ReadSession(Session):
+    """Session that reads from the replica, falling back to the primary.
+
+    The choice is made on first use, after the request's dependencies (and so
+    the current user) are resolved: clients and users who wrote within the
+    last read_your_writes_seconds read from the primary (see
+    ReadYourWritesMiddleware for how far that reaches), and a replica that
+    cannot be reached is skipped for read_replica_retry_seconds.
+    """
+
+    def __init__(self, primary: Session, **kwargs):
+        super().__init__(**kwargs)
+        self.primary = primary
+        self._bind = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        global _replica_down_until
+        if self._bind is None:
+            self._bind = get_engine()
+            if not _wrote_recently(self.primary.info.get("username")) and time.monotonic() >= _replica_down_until:
+                try:
+                    self._bind = get_read_engine().connect()
+                except DBAPIError as e:
+                    _replica_down_until = time.monotonic() + settings.read_replica_retry_seconds
+                    print(f"Read replica note: {str(e)}")
+        return self._bind
+
+    def close(self):
+        super().close()
+        if self._bind is not None and self._bind is not get_engine():
+            self._bind.close()
+        self._bind = None
+
+
+# Dependency to get a read-only DB session (the primary session without a replica)
+def get_read_db(primary: Session = Depends(get_db)):
+    if get_read_engine() is None:
+        yield primary
+        return
+    db = ReadSession(primary, autocommit=False, autoflush=False)
+    try:
+        yield db
+    finally:
+        db.close()
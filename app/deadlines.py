@@ -0,0 +1,46 @@
+"""Per-request time budget for outbound calls.
+
+DeadlineMiddleware gives every HTTP request REQUEST_BUDGET_SECONDS from the
+moment it arrives. Outbound calls made while handling it (LiveKit RPCs) use
+call_timeout() so one slow dependency can't hold a worker past the budget,
+however many calls the request makes. Work outside a request (background
+jobs) has no budget and only the per-call timeout applies.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Optional
+from .config import settings
+
+# time.monotonic() by which the current request should be done
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None outside a request."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(limit: float) -> float:
+    """Timeout for one call: limit, cut down to what is left of the request budget."""
+    left = remaining()
+    return limit if left is None else min(limit, left)
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware starting each request's budget."""
+
+    def __init__(self, app, budget_seconds: float):
+        self.app = app
+        self.budget_seconds = budget_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _deadline.set(time.monotonic() + self.budget_seconds)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _deadline.reset(token)
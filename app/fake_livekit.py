@@ -0,0 +1,333 @@
+"""In-process stand-in for a LiveKit server.
+
+Implements the RoomService Twirp endpoints used by LiveKitService
+(CreateRoom, ListRooms, ListParticipants, DeleteRoom) plus the webhook
+sender, with injectable latency, error rate and participant churn. Runs on
+its own thread and event loop so it can back a local app, a load test or a
+benchmark without a real SFU:
+
+    python -m app.fake_livekit --port 7880 --latency-ms 20 --error-rate 0.01
+
+Point the app at it with LIVEKIT_URL=http://127.0.0.1:7880 and the same
+LIVEKIT_API_KEY/LIVEKIT_API_SECRET.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+import aiohttp
+from aiohttp import web
+from google.protobuf.json_format import MessageToJson, Parse
+from livekit import api
+from livekit.protocol import models as proto_models
+from livekit.protocol import room as proto_room
+from livekit.protocol import webhook as proto_webhook
+
+TWIRP_PREFIX = "/twirp/livekit.RoomService/"
+
+
+@dataclass
+class FakeLiveKitConfig:
+    api_key: str = "devkey"
+    api_secret: str = "secret"
+    host: str = "127.0.0.1"
+    port: int = 7880
+    # Injected per-RPC delay: latency_ms plus uniform jitter in [0, jitter_ms]
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Fraction of RPCs answered with a Twirp "unavailable" error
+    error_rate: float = 0.0
+    # Every churn_interval seconds each room gains or loses a participant
+    # with probability churn_rate (0 disables churn)
+    churn_interval: float = 0.0
+    churn_rate: float = 0.5
+    # Receiver for room/participant webhook events (None disables webhooks)
+    webhook_url: Optional[str] = None
+    # Seed for latency, errors and churn so runs are reproducible
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeRoom:
+    name: str
+    sid: str
+    creation_time: int
+    max_participants: int = 0
+    participants: Dict[str, proto_models.ParticipantInfo] = field(default_factory=dict)
+
+    def to_proto(self) -> proto_models.Room:
+        return proto_models.Room(
+            sid=self.sid,
+            name=self.name,
+            creation_time=self.creation_time,
+            max_participants=self.max_participants,
+            num_participants=len(self.participants),
+        )
+
+
+class FakeLiveKitServer:
+    """RoomService Twirp server with deterministic latency, errors and churn."""
+
+    def __init__(self, config: Optional[FakeLiveKitConfig] = None):
+        self.config = config or FakeLiveKitConfig()
+        self.rooms: Dict[str, FakeRoom] = {}
+        self.calls: Dict[str, int] = {}
+        self._random = random.Random(self.config.seed)
+        self._verifier = api.TokenVerifier(self.config.api_key, self.config.api_secret)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._churn_task: Optional[asyncio.Task] = None
+        self._started = threading.Event()
+        self._startup_error: Optional[BaseException] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.config.host}:{self.config.port}"
+
+    # Lifecycle
+
+    def start(self) -> "FakeLiveKitServer":
+        """Serve on a background thread; returns once the port is bound."""
+        self._thread = threading.Thread(target=self._run, name="fake-livekit", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._startup_error is not None:
+            raise self._startup_error
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._startup())
+        except BaseException as e:
+            self._startup_error = e
+            self._loop.close()
+            self._loop = None
+            self._started.set()
+            return
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _startup(self) -> None:
+        app = web.Application()
+        app.router.add_post(TWIRP_PREFIX + "{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.config.host, self.config.port).start()
+        # Report the real port when started with port 0
+        self.config.port = self._runner.addresses[0][1]
+        self._session = aiohttp.ClientSession()
+        if self.config.churn_interval > 0:
+            self._churn_task = asyncio.create_task(self._churn())
+
+    async def _shutdown(self) -> None:
+        if self._churn_task is not None:
+            self._churn_task.cancel()
+        await self._session.close()
+        await self._runner.cleanup()
+
+    # Twirp handling
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+        delay = self.config.latency_ms + self._random.uniform(0, self.config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        if not self._authorized(request):
+            return self._error(401, "unauthenticated", "invalid authorization token")
+        if self._random.random() < self.config.error_rate:
+            return self._error(503, "unavailable", "injected failure")
+
+        handler = {
+            "CreateRoom": (proto_room.CreateRoomRequest, self._create_room),
+            "ListRooms": (proto_room.ListRoomsRequest, self._list_rooms),
+            "ListParticipants": (proto_room.ListParticipantsRequest, self._list_participants),
+            "DeleteRoom": (proto_room.DeleteRoomRequest, self._delete_room),
+        }.get(method)
+        if handler is None:
+            return self._error(404, "bad_route", f"no handler for {method}")
+
+        request_class, func = handler
+        body = await request.read()
+        is_json = request.content_type == "application/json"
+        try:
+            message = Parse(body, request_class()) if is_json else request_class.FromString(body)
+        except Exception as e:
+            return self._error(400, "malformed", str(e))
+
+        result = await func(message)
+        if isinstance(result, web.Response):
+            return result
+        if is_json:
+            return web.Response(body=MessageToJson(result), content_type="application/json")
+        return web.Response(body=result.SerializeToString(), content_type="application/protobuf")
+
+    def _authorized(self, request: web.Request) -> bool:
+        header = request.headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            return False
+        try:
+            self._verifier.verify(header[len("Bearer "):])
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _error(status: int, code: str, msg: str) -> web.Response:
+        return web.json_response({"code": code, "msg": msg}, status=status)
+
+    async def _create_room(self, message: proto_room.CreateRoomRequest):
+        room = self.rooms.get(message.name)
+        if room is None:
+            room = FakeRoom(
+                name=message.name,
+                sid=f"RM_{uuid.uuid4().hex[:12]}",
+                creation_time=int(time.time()),
+                max_participants=message.max_participants,
+            )
+            self.rooms[message.name] = room
+            self._send_webhook("room_started", room=room.to_proto())
+        return room.to_proto()
+
+    async def _list_rooms(self, message: proto_room.ListRoomsRequest):
+        names = list(message.names) or list(self.rooms)
+        return proto_room.ListRoomsResponse(
+            rooms=[self.rooms[name].to_proto() for name in names if name in self.rooms]
+        )
+
+    async def _list_participants(self, message: proto_room.ListParticipantsRequest):
+        room = self.rooms.get(message.room)
+        if room is None:
+            return self._error(404, "not_found", "room not found")
+        return proto_room.ListParticipantsResponse(participants=list(room.participants.values()))
+
+    async def _delete_room(self, message: proto_room.DeleteRoomRequest):
+        room = self.rooms.pop(message.room, None)
+        if room is None:
+            return self._error(404, "not_found", "room not found")
+        self._send_webhook("room_finished", room=room.to_proto())
+        return proto_room.DeleteRoomResponse()
+
+    # Participants and churn
+
+    def add_participant(self, room_name: str, identity: str) -> proto_models.ParticipantInfo:
+        """Connect a participant, creating the room like a real SFU would."""
+        room = self.rooms.get(room_name)
+        if room is None:
+            room = FakeRoom(name=room_name, sid=f"RM_{uuid.uuid4().hex[:12]}", creation_time=int(time.time()))
+            self.rooms[room_name] = room
+            self._send_webhook("room_started", room=room.to_proto())
+        participant = proto_models.ParticipantInfo(
+            sid=f"PA_{uuid.uuid4().hex[:12]}",
+            identity=identity,
+            name=identity,
+            state=proto_models.ParticipantInfo.State.ACTIVE,
+            joined_at=int(time.time()),
+        )
+        room.participants[identity] = participant
+        self._send_webhook("participant_joined", room=room.to_proto(), participant=participant)
+        return participant
+
+    def remove_participant(self, room_name: str, identity: str) -> None:
+        room = self.rooms.get(room_name)
+        participant = room.participants.pop(identity, None) if room else None
+        if participant is not None:
+            self._send_webhook("participant_left", room=room.to_proto(), participant=participant)
+
+    async def _churn(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.churn_interval)
+            for room in list(self.rooms.values()):
+                if self._random.random() >= self.config.churn_rate:
+                    continue
+                if room.participants and self._random.random() < 0.5:
+                    self.remove_participant(room.name, self._random.choice(list(room.participants)))
+                else:
+                    self.add_participant(room.name, f"churn_{uuid.uuid4().hex[:8]}")
+
+    # Webhooks
+
+    def _send_webhook(self, event: str, **fields) -> None:
+        if self.config.webhook_url and self._session is not None:
+            asyncio.create_task(self._post_webhook(event, **fields))
+
+    async def _post_webhook(self, event: str, **fields) -> None:
+        """Post a signed event the way LiveKit does (JWT carrying the body's sha256)."""
+        message = proto_webhook.WebhookEvent(
+            event=event,
+            id=f"EV_{uuid.uuid4().hex[:12]}",
+            created_at=int(time.time()),
+            **fields,
+        )
+        body = MessageToJson(message)
+        digest = base64.b64encode(hashlib.sha256(body.encode()).digest()).decode()
+        token = api.AccessToken(self.config.api_key, self.config.api_secret).with_sha256(digest).to_jwt()
+        try:
+            async with self._session.post(
+                self.config.webhook_url,
+                data=body,
+                headers={"Authorization": token, "Content-Type": "application/webhook+json"},
+            ) as response:
+                await response.read()
+        except Exception as e:
+            print(f"Fake LiveKit webhook note: {str(e)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a fake LiveKit RoomService server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7880)
+    parser.add_argument("--api-key", default=None, help="Defaults to LIVEKIT_API_KEY from settings")
+    parser.add_argument("--api-secret", default=None, help="Defaults to LIVEKIT_API_SECRET from settings")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--churn-interval", type=float, default=0.0)
+    parser.add_argument("--churn-rate", type=float, default=0.5)
+    parser.add_argument("--webhook-url", default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.api_key is None or args.api_secret is None:
+        from .config import settings
+        args.api_key = args.api_key or settings.livekit_api_key
+        args.api_secret = args.api_secret or settings.livekit_api_secret
+
+    config = FakeLiveKitConfig(**vars(args))
+    server = FakeLiveKitServer(config).start()
+    print(f"Fake LiveKit listening on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
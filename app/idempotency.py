@@ -0,0 +1,215 @@
+"""Idempotency-Key support for mutating endpoints.
+
+A client that retries a POST after a timeout sends the same
+``Idempotency-Key`` header; the first request runs and its response is
+stored, later ones get the stored response back (with
+``Idempotent-Replayed: true``) without running the endpoint again.
+
+Keys are scoped to the user. Each key is a row in ``idempotency_keys``:
+inserted as pending before the endpoint runs (so a concurrent duplicate on
+any worker gets 409), completed with the response body afterwards, and
+purged once ``expires_at`` passes. Completed responses are also kept in a
+per-worker LRU so most retries never reach the table. Only 2xx responses
+are stored; on errors the key is released so the client can retry.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import Depends, Header, HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from .auth import Principal, get_current_active_user
+from .config import settings
+from .database import SessionLocal, dialect_insert, get_db
+from .metrics import IDEMPOTENCY_LOOKUPS
+from .models import IdempotencyKey
+
+# How long a pending key blocks duplicates before it may be taken over
+PENDING_SECONDS = 60
+MAX_KEY_LENGTH = 255
+
+# (user_id, key) -> (request_hash, status_code, body, expires_at)
+_responses: "OrderedDict[Tuple[int, str], Tuple[str, int, bytes, int]]" = OrderedDict()
+# Requests use the cache from threadpool threads
+_responses_lock = threading.Lock()
+
+
+def _remember(cache_key: Tuple[int, str], entry: Tuple[str, int, bytes, int]) -> None:
+    with _responses_lock:
+        _responses[cache_key] = entry
+        _responses.move_to_end(cache_key)
+        while len(_responses) > settings.idempotency_cache_size:
+            _responses.popitem(last=False)
+
+
+def _cached(cache_key: Tuple[int, str], now: int) -> Optional[Tuple[str, int, bytes, int]]:
+    """The unexpired cached response for a key, marked as recently used."""
+    with _responses_lock:
+        entry = _responses.get(cache_key)
+        if entry is None or entry[3] <= now:
+            return None
+        _responses.move_to_end(cache_key)
+        return entry
+
+
+def _replay(request_hash: str, stored_hash: str, status_code: int, body: bytes) -> Response:
+    if stored_hash != request_hash:
+        IDEMPOTENCY_LOOKUPS.inc("mismatch")
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+class IdempotentRequest:
+    """One request's claim on an Idempotency-Key (a no-op without the header)."""
+
+    def __init__(self, db: Session, user_id: int, key: Optional[str], request_hash: str):
+        self.db = db
+        self.user_id = user_id
+        self.key = key
+        self.request_hash = request_hash
+        # The stored response when this request is a retry; return it as is
+        self.replay: Optional[Response] = None
+        self.claimed = False
+
+    def begin(self) -> None:
+        """Return a stored response, claim the key, or reject a conflicting request."""
+        now = int(time.time())
+        entry = _cached((self.user_id, self.key), now)
+        if entry is not None:
+            IDEMPOTENCY_LOOKUPS.inc("memory")
+            self.replay = _replay(self.request_hash, entry[0], entry[1], entry[2])
+            return
+
+        pending = dict(request_hash=self.request_hash, status_code=None, response_body=None,
+                       expires_at=now + PENDING_SECONDS)
+        claimed = self.db.execute(
+            dialect_insert(self.db)(IdempotencyKey)
+            .values(user_id=self.user_id, key=self.key, **pending)
+            .on_conflict_do_nothing(index_elements=["user_id", "key"])
+        ).rowcount == 1
+        if not claimed:
+            # Take over a key whose response (or crashed request) has expired
+            claimed = self.db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.key == self.key,
+                IdempotencyKey.expires_at <= now,
+            ).update(pending, synchronize_session=False) == 1
+        self.db.commit()
+        if claimed:
+            IDEMPOTENCY_LOOKUPS.inc("new")
+            self.claimed = True
+            return
+
+        row = self.db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == self.user_id,
+            IdempotencyKey.key == self.key,
+        ).first()
+        if row is None or row.status_code is None:
+            if row is not None and row.request_hash != self.request_hash:
+                IDEMPOTENCY_LOOKUPS.inc("mismatch")
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            IDEMPOTENCY_LOOKUPS.inc("in_progress")
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+
+        IDEMPOTENCY_LOOKUPS.inc("database")
+        _remember((self.user_id, self.key), (row.request_hash, row.status_code, row.response_body, row.expires_at))
+        self.replay = _replay(self.request_hash, row.request_hash, row.status_code, row.response_body)
+
+    def save(self, response: Response) -> Response:
+        """Store a successful response for retries of this key; return it unchanged."""
+        if not self.claimed or not 200 <= response.status_code < 300:
+            return response
+        expires_at = int(time.time()) + settings.idempotency_ttl_seconds
+        try:
+            self.db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.key == self.key,
+            ).update({
+                "status_code": response.status_code,
+                "response_body": response.body,
+                "expires_at": expires_at,
+            }, synchronize_session=False)
+            self.db.commit()
+        except DBAPIError as e:
+            self.db.rollback()
+            print(f"Idempotency note: {str(e)}")
+            return response
+        self.claimed = False
+        _remember((self.user_id, self.key), (self.request_hash, response.status_code, response.body, expires_at))
+        return response
+
+    def release(self) -> None:
+        """Drop a key whose request failed so a retry runs again."""
+        if not self.claimed:
+            return
+        try:
+            self.db.rollback()
+            self.db.query(IdempotencyKey).filter(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.key == self.key,
+                IdempotencyKey.status_code.is_(None),
+            ).delete(synchronize_session=False)
+            self.db.commit()
+        except DBAPIError as e:
+            print(f"Idempotency note: {str(e)}")
+        self.claimed = False
+
+
+async def _request_hash(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=MAX_KEY_LENGTH)
+) -> str:
+    """Hash of the request a key is used for ("" without a key)."""
+    if idempotency_key is None:
+        return ""
+    body = await request.body()
+    return hashlib.sha256(
+        request.method.encode() + b" " + request.url.path.encode() + b"\n" + body
+    ).hexdigest()
+
+
+def idempotency_key(
+    idempotency_key: Optional[str] = Header(None, max_length=MAX_KEY_LENGTH),
+    request_hash: str = Depends(_request_hash),
+    current_user: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Dependency: claim the request's Idempotency-Key (if any) for the endpoint.
+
+    A plain generator, so its database work runs in the threadpool; only
+    reading the body (in _request_hash) needs the event loop.
+    """
+    idempotent = IdempotentRequest(db, current_user.id, idempotency_key, request_hash)
+    if idempotency_key is not None:
+        idempotent.begin()
+    try:
+        yield idempotent
+    finally:
+        idempotent.release()
+
+
+def purge_expired_idempotency_keys(db: Session) -> int:
+    """Delete expired keys; returns how many were removed."""
+    deleted = db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= int(time.time())
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def purge_expired_idempotency_keys_job() -> None:
+    """Background entry point with its own session."""
+    db = SessionLocal()
+    try:
+        purge_expired_idempotency_keys(db)
+    finally:
+        db.close()
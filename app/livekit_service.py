@@ -1,68 +1,301 @@
-from livekit import api
+"""LiveKit RoomService client.
+
+Every RPC goes through LiveKitService._call, which bounds it by
+LIVEKIT_RPC_TIMEOUT_SECONDS and by what is left of the request's budget
+(see deadlines), and by a per-method circuit breaker: after
+LIVEKIT_CIRCUIT_FAILURES consecutive failures the method fails fast for
+LIVEKIT_CIRCUIT_RESET_SECONDS, then one probe call decides whether it closes
+again. The public methods never raise: on failure (or an open circuit) the
+list calls serve their last successful answer if it is at most
+LIVEKIT_STALE_SECONDS old, and every call otherwise falls back as before.
+With LIVEKIT_HEDGE_AFTER_MS set, the list calls (which are idempotent) send
+a second request when the first is slower than that and take whichever
+answers first.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Tuple
 from .config import settings
+from .deadlines import call_timeout
+
+# The livekit SDK (protobuf + aiohttp) is imported on first use, not at import
+if TYPE_CHECKING:
+    from livekit import api
+from .metrics import (
+    LIVEKIT_CIRCUIT_STATE,
+    LIVEKIT_RPC_ERRORS,
+    LIVEKIT_RPC_FALLBACKS,
+    LIVEKIT_RPC_HEDGES,
+    LIVEKIT_RPC_SECONDS,
+    TOKEN_MINT_SECONDS,
+)
+from .tracing import start_span
+
+# Twirp errors about the request itself; LiveKit answered, so they don't trip the breaker
+CLIENT_ERROR_CODES = {"not_found", "already_exists", "invalid_argument", "malformed", "out_of_range", "failed_precondition"}
+# Last successful list answers kept for fallbacks (per worker)
+LAST_VALUE_CACHE_SIZE = 1000
+
+
+@contextmanager
+def observe_rpc(method: str):
+    """Time a RoomService RPC and record it as a trace span."""
+    with LIVEKIT_RPC_SECONDS.time(method), start_span(f"livekit.{method}"):
+        yield
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a method whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one RPC method (event loop only)."""
+
+    STATES = ("closed", "open", "half_open")
+
+    def __init__(self, method: str, failure_threshold: int, reset_seconds: float):
+        self.method = method
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = 0.0
+        # Whether the single half-open probe is in flight
+        self.probing = False
+        self._set_state("closed")
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        for name in self.STATES:
+            LIVEKIT_CIRCUIT_STATE.set(1 if name == state else 0, self.method, name)
+
+    def allow(self) -> bool:
+        """Whether a call may go out now."""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self._set_state("half_open")
+        if self.state == "half_open":
+            if self.probing:
+                return False
+            self.probing = True
+        return self.state != "open"
+
+    def success(self) -> None:
+        self.failures = 0
+        self.probing = False
+        if self.state != "closed":
+            self._set_state("closed")
+
+    def failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state("open")
+
+    def abandon(self) -> None:
+        """The call ended without saying anything about LiveKit's health."""
+        self.probing = False
+
+
+async def _hedged(method: str, rpc: Callable[[], Awaitable[Any]], delay: float) -> Any:
+    """Run rpc; if it hasn't answered after delay, run it again and take the first success."""
+    tasks = [asyncio.ensure_future(rpc())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return tasks[0].result()
+        tasks.append(asyncio.ensure_future(rpc()))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    LIVEKIT_RPC_HEDGES.inc(method, "first" if task is tasks[0] else "second")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
 
 
 class LiveKitService:
     def __init__(self):
-        self.api_key = settings.livekit_api_key
-        self.api_secret = settings.livekit_api_secret
-        self.livekit_url = settings.livekit_url
-        
-        # Get the base HTTP URL for API calls
-        self.http_url = self.livekit_url.replace('wss://', 'https://').replace('ws://', 'http://')
+        # Shared API client (and its HTTP connection pool), created on first use
+        self._api: Optional["api.LiveKitAPI"] = None
+        self._api_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # (method, key) -> (time.monotonic() when answered, value)
+        self._last_values: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+
+    @property
+    def api_key(self) -> str:
+        return settings.livekit_api_key
+
+    @property
+    def api_secret(self) -> str:
+        return settings.livekit_api_secret
+
+    @property
+    def livekit_url(self) -> str:
+        return settings.livekit_url
+
+    @property
+    def http_url(self) -> str:
+        """Base HTTP URL for API calls."""
+        return self.livekit_url.replace('wss://', 'https://').replace('ws://', 'http://')
+
+    @property
+    def room_service(self) -> "api.room_service.RoomService":
+        """RoomService client bound to the running event loop."""
+        from livekit import api
+        loop = asyncio.get_running_loop()
+        if self._api is None or self._api_loop is not loop:
+            self._api = api.LiveKitAPI(self.http_url, self.api_key, self.api_secret)
+            self._api_loop = loop
+        return self._api.room
+
+    async def aclose(self):
+        """Close the shared API client's connection pool."""
+        if self._api is not None:
+            await self._api.aclose()
+            self._api = None
+            self._api_loop = None
+
+    def breaker(self, method: str) -> CircuitBreaker:
+        breaker = self._breakers.get(method)
+        if breaker is None:
+            breaker = self._breakers[method] = CircuitBreaker(
+                method, settings.livekit_circuit_failures, settings.livekit_circuit_reset_seconds
+            )
+        return breaker
+
+    async def _call(self, method: str, rpc: Callable[[], Awaitable[Any]], hedge: bool = False) -> Any:
+        """Run one RPC under its timeout and circuit breaker; raises on any failure."""
+        breaker = self.breaker(method)
+        if not breaker.allow():
+            raise CircuitOpenError(f"LiveKit {method} circuit is open")
+        limit = settings.livekit_rpc_timeout_seconds
+        timeout = call_timeout(limit)
+        if timeout <= 0:
+            breaker.abandon()
+            raise asyncio.TimeoutError(f"request budget spent before LiveKit {method}")
+        hedge_after = settings.livekit_hedge_after_ms / 1000
+        try:
+            with observe_rpc(method):
+                if hedge and hedge_after > 0:
+                    result = await asyncio.wait_for(_hedged(method, rpc, hedge_after), timeout)
+                else:
+                    result = await asyncio.wait_for(rpc(), timeout)
+        except asyncio.TimeoutError:
+            # Only a timeout of the full per-call limit counts against LiveKit
+            if timeout >= limit:
+                breaker.failure()
+            else:
+                breaker.abandon()
+            raise asyncio.TimeoutError(f"LiveKit {method} timed out after {timeout:.2f}s")
+        except asyncio.CancelledError:
+            breaker.abandon()
+            raise
+        except Exception as e:
+            if getattr(e, "code", None) in CLIENT_ERROR_CODES:
+                breaker.success()
+            else:
+                breaker.failure()
+            raise
+        breaker.success()
+        return result
+
+    def _remember(self, method: str, key: str, value: Any) -> None:
+        self._last_values[(method, key)] = (time.monotonic(), value)
+        self._last_values.move_to_end((method, key))
+        while len(self._last_values) > LAST_VALUE_CACHE_SIZE:
+            self._last_values.popitem(last=False)
+
+    @staticmethod
+    def _note(method: str, action: str, error: Exception) -> None:
+        # An open circuit is already reported by the breaker state metric
+        if isinstance(error, CircuitOpenError):
+            return
+        LIVEKIT_RPC_ERRORS.inc(method)
+        print(f"{action} note: {str(error)}")
+
+    def _fallback(self, method: str, key: str, error: Exception, default: Any) -> Any:
+        """Value to return when a call failed: the last fresh enough answer, else default."""
+        reason = "circuit_open" if isinstance(error, CircuitOpenError) else (
+            "timeout" if isinstance(error, asyncio.TimeoutError) else "error"
+        )
+        entry = self._last_values.get((method, key))
+        if entry is not None and time.monotonic() - entry[0] <= settings.livekit_stale_seconds:
+            LIVEKIT_RPC_FALLBACKS.inc(method, reason, "cached")
+            return entry[1]
+        LIVEKIT_RPC_FALLBACKS.inc(method, reason, "default")
+        return default
 
     def generate_access_token(self, room_name: str, participant_name: str) -> str:
         """Generate a LiveKit access token for a participant to join a room."""
-        token = api.AccessToken(self.api_key, self.api_secret)
-        token.with_identity(participant_name)
-        token.with_name(participant_name)
-        token.with_grants(api.VideoGrants(
-            room_join=True,
-            room=room_name,
-            can_publish=True,
-            can_subscribe=True,
-        ))
-        
-        return token.to_jwt()
+        from livekit import api
+        with TOKEN_MINT_SECONDS.time("livekit"), start_span("livekit.generate_access_token"):
+            token = api.AccessToken(self.api_key, self.api_secret)
+            token.with_identity(participant_name)
+            token.with_name(participant_name)
+            token.with_grants(api.VideoGrants(
+                room_join=True,
+                room=room_name,
+                can_publish=True,
+                can_subscribe=True,
+            ))
+
+            return token.to_jwt()
 
     async def create_room(self, room_name: str) -> dict:
         """Create a room in LiveKit."""
-        # For now, we'll create a mock response since room creation happens automatically
-        # when the first participant joins. We'll return a simple success response.
-        return {
-            "name": room_name,
-            "sid": f"RM_{room_name}",
-            "creation_time": 0,
-            "num_participants": 0
-        }
+        from livekit import api
+        try:
+            room = await self._call("CreateRoom", lambda: self.room_service.create_room(
+                api.CreateRoomRequest(name=room_name)
+            ))
+            return {
+                "name": room.name,
+                "sid": room.sid,
+                "creation_time": room.creation_time,
+                "num_participants": room.num_participants
+            }
+        except Exception as e:
+            # Rooms are also created automatically when the first participant
+            # joins, so fall back to a local description of the room.
+            self._note("CreateRoom", "Room creation", e)
+            return {
+                "name": room_name,
+                "sid": f"RM_{room_name}",
+                "creation_time": 0,
+                "num_participants": 0
+            }
 
     async def delete_room(self, room_name: str) -> bool:
         """Delete a room from LiveKit."""
+        from livekit import api
         try:
-            room_service = api.room_service.RoomService(
-                self.http_url,
-                self.api_key,
-                self.api_secret
-            )
-            await room_service.delete_room(
+            await self._call("DeleteRoom", lambda: self.room_service.delete_room(
                 api.DeleteRoomRequest(room=room_name)
-            )
+            ))
             return True
         except Exception as e:
             # Room might not exist, which is fine for our use case
-            print(f"Room deletion note: {str(e)}")
+            self._note("DeleteRoom", "Room deletion", e)
             return True
 
     async def list_rooms(self) -> list:
         """List all active rooms in LiveKit."""
+        from livekit import api
         try:
-            room_service = api.room_service.RoomService(
-                self.http_url,
-                self.api_key,
-                self.api_secret
+            rooms = await self._call(
+                "ListRooms", lambda: self.room_service.list_rooms(api.ListRoomsRequest()), hedge=True
             )
-            rooms = await room_service.list_rooms(api.ListRoomsRequest())
-            return [
+            result = [
                 {
                     "name": room.name,
                     "sid": room.sid,
@@ -72,33 +305,33 @@ class LiveKitService:
                 for room in rooms.rooms
             ]
         except Exception as e:
-            print(f"List rooms note: {str(e)}")
-            return []
+            self._note("ListRooms", "List rooms", e)
+            return self._fallback("ListRooms", "", e, [])
+        self._remember("ListRooms", "", result)
+        return result
 
     async def get_room_participants(self, room_name: str) -> list:
         """Get participants in a specific room."""
+        from livekit import api
         try:
-            room_service = api.room_service.RoomService(
-                self.http_url,
-                self.api_key,
-                self.api_secret
-            )
-            participants = await room_service.list_participants(
+            participants = await self._call("ListParticipants", lambda: self.room_service.list_participants(
                 api.ListParticipantsRequest(room=room_name)
-            )
-            return [
+            ), hedge=True)
+            result = [
                 {
                     "identity": p.identity,
                     "name": p.name,
                     "sid": p.sid,
                     "joined_at": p.joined_at,
-                    "state": p.state.name if p.state else "UNKNOWN"
+                    "state": api.ParticipantInfo.State.Name(p.state)
                 }
                 for p in participants.participants
             ]
         except Exception as e:
-            print(f"Get participants note: {str(e)}")
-            return []
+            self._note("ListParticipants", "Get participants", e)
+            return self._fallback("ListParticipants", room_name, e, [])
+        self._remember("ListParticipants", room_name, result)
+        return result
 
 
 # Singleton instance
@@ -1,17 +1,153 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .routers import auth, rooms, users
+from fastapi.responses import Response
+from sqlalchemy.exc import DBAPIError
+from .database import (
+    ReadYourWritesMiddleware,
+    check_schema_version,
+    create_schema,
+    dispose_engines,
+    memory_database,
+    prewarm_pools,
+)
+from .routers import admin, auth, lobby, rooms, users
 from .config import settings
+from .background import run_periodic
+from .usage import refresh_usage_rollups_job
+from .idempotency import purge_expired_idempotency_keys_job
+from .admission import purge_rate_limit_buckets_job
+from .revocation import refresh_revocations_job
+from .room_cleanup import SHUTDOWN_FLUSH_SECONDS, close_idle_rooms_job, room_deletions
+from .bulk_import import shutdown_hash_pool
+from .livekit_service import livekit_service
+from .metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware, monitor_event_loop_lag
+from .tracing import TracingMiddleware, start_exporter, shutdown_exporter
+from .profiling import ProfilerMiddleware
+from .deadlines import DeadlineMiddleware
+from .routers.admin import profile_store
+from .serialization import FastJSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background jobs on startup and cancel them on shutdown.
+
+    Nothing touches the database at import; the schema is managed by Alembic
+    and only checked here (SCHEMA_CHECK). An in-memory SQLite database can't
+    be migrated from outside the process, so its tables are created here.
+    """
+    start_exporter(
+        settings.tracing_export_path, settings.tracing_otlp_endpoint, settings.tracing_export_max_bytes
+    )
+    if memory_database():
+        await run_in_threadpool(create_schema)
+    elif settings.schema_check != "off":
+        await run_in_threadpool(check_schema_version, settings.schema_check == "fail")
+    if settings.db_pool_prewarm:
+        await prewarm_pools()
+    # Load the revocation list before serving. If the database is down,
+    # authentication answers 503 until the periodic refresh loads it.
+    try:
+        await run_in_threadpool(refresh_revocations_job)
+    except DBAPIError as e:
+        print(f"Token revocation note: {str(e)}")
+
+    room_deletions.start(settings.livekit_delete_concurrency)
+    tasks = []
+    if settings.usage_rollup_interval_seconds > 0:
+        tasks.append(asyncio.create_task(run_periodic(
+            "Usage rollup",
+            settings.usage_rollup_interval_seconds,
+            refresh_usage_rollups_job,
+        )))
+    tasks.append(asyncio.create_task(run_periodic(
+        "Token revocation refresh",
+        settings.token_revocation_refresh_seconds,
+        refresh_revocations_job,
+        initial_delay_seconds=settings.token_revocation_refresh_seconds,
+    )))
+    if settings.idempotency_purge_interval_seconds > 0:
+        tasks.append(asyncio.create_task(run_periodic(
+            "Idempotency key purge",
+            settings.idempotency_purge_interval_seconds,
+            purge_expired_idempotency_keys_job,
+        )))
+    if settings.rate_limit_shared and settings.rate_limit_purge_interval_seconds > 0:
+        tasks.append(asyncio.create_task(run_periodic(
+            "Rate limit bucket purge",
+            settings.rate_limit_purge_interval_seconds,
+            purge_rate_limit_buckets_job,
+        )))
+    if settings.room_close_interval_seconds > 0:
+        tasks.append(asyncio.create_task(run_periodic(
+            "Idle room close",
+            settings.room_close_interval_seconds,
+            close_idle_rooms_job,
+        )))
+    if settings.metrics_enabled:
+        tasks.append(asyncio.create_task(monitor_event_loop_lag()))
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await room_deletions.aclose(SHUTDOWN_FLUSH_SECONDS)
+    shutdown_hash_pool()
+    await livekit_service.aclose()
+    dispose_engines()
+    shutdown_exporter()
+
+
+def configured_middleware(app):
+    """Wrap app in the middlewares enabled in settings (tracing outermost)."""
+    app = DeadlineMiddleware(app, budget_seconds=settings.request_budget_seconds)
+    if settings.profiler_token or settings.profiler_sample_rate > 0:
+        app = ProfilerMiddleware(
+            app,
+            store=profile_store(),
+            token=settings.profiler_token,
+            sample_rate=settings.profiler_sample_rate,
+            interval_seconds=settings.profiler_interval_ms / 1000,
+        )
+    if settings.metrics_enabled:
+        app = MetricsMiddleware(app)
+    if settings.tracing_export_path or settings.tracing_otlp_endpoint:
+        app = TracingMiddleware(
+            app,
+            sample_rate=settings.tracing_sample_rate,
+            trusted_parents=settings.tracing_trusted_parents,
+        )
+    return app
+
+
+class ConfiguredMiddleware:
+    """Pure ASGI middleware building configured_middleware() on its first call.
+
+    The first call is the lifespan startup, so the settings are read when the
+    server starts rather than when app.main is imported.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.stack = None
+
+    async def __call__(self, scope, receive, send):
+        if self.stack is None:
+            self.stack = configured_middleware(self.app)
+        await self.stack(scope, receive, send)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="LiveKit Video Calling Backend",
     description="A backend API for video calling with room management and user authentication using LiveKit",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -22,11 +158,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(ConfiguredMiddleware)
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(rooms.router)
 app.include_router(users.router)
+app.include_router(lobby.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -46,6 +186,12 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics for this worker process."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
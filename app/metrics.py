@@ -0,0 +1,278 @@
+"""Minimal Prometheus metrics with lock-light collection.
+
+Each metric keeps its series in a dict guarded by its own lock, held only
+for a dict lookup and an add. Histogram buckets are stored per bucket and
+made cumulative at scrape time, so an observation is one bisect and three
+additions. Values are per process; scrape every worker.
+"""
+
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class Gauge(Metric):
+    """A settable gauge, or one computed at scrape time by a callback."""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def collect(self) -> List[str]:
+        if self._callback is not None:
+            items = list(self._callback().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# HTTP
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+)
+HTTP_RESPONSES = Counter(
+    "http_responses_total", "HTTP responses by route template and status code.", ("method", "route", "status")
+)
+
+# Database pool (labelled by pool: "primary" or "replica")
+DB_POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection.", ("pool",)
+)
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Database connections checked out of the pool.", ("pool",))
+DB_POOL_CONNECTIONS_OPENED = Counter("db_pool_connections_opened_total", "New database connections opened.", ("pool",))
+
+# LiveKit
+LIVEKIT_RPC_SECONDS = Histogram("livekit_rpc_duration_seconds", "LiveKit RoomService RPC latency.", ("method",))
+LIVEKIT_RPC_ERRORS = Counter("livekit_rpc_errors_total", "LiveKit RoomService RPC failures.", ("method",))
+LIVEKIT_RPC_FALLBACKS = Counter(
+    "livekit_rpc_fallbacks_total", "LiveKit calls answered without a successful RPC, by reason and what was served.",
+    ("method", "reason", "served"),
+)
+LIVEKIT_RPC_HEDGES = Counter("livekit_rpc_hedges_total", "Hedged LiveKit calls by which request answered.", ("method", "winner"))
+# 1 for each method's current state (closed, open or half_open), 0 for the others
+LIVEKIT_CIRCUIT_STATE = Gauge("livekit_circuit_state", "LiveKit circuit breaker state per RPC method.", ("method", "state"))
+LIVEKIT_DELETIONS_PENDING = Gauge("livekit_deletions_pending", "LiveKit room deletions queued in this worker.")
+
+# Rooms deactivated by a job, by reason
+ROOMS_CLOSED = Counter("rooms_closed_total", "Rooms deactivated automatically.", ("reason",))
+
+# Auth
+TOKEN_MINT_SECONDS = Histogram(
+    "token_mint_duration_seconds", "Time to mint an access token.", ("kind",),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_duration_seconds", "bcrypt hashing and verification time.", ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5),
+)
+
+# Admission control for the bcrypt endpoints
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total", "Requests rejected by admission control.", ("endpoint", "reason")
+)
+PASSWORD_HASH_CONCURRENCY_LIMIT = Gauge(
+    "password_hash_concurrency_limit", "Adaptive limit on concurrent password hashing in this worker."
+)
+
+# Idempotency-Key lookups by result: new, memory, database, in_progress or mismatch
+IDEMPOTENCY_LOOKUPS = Counter("idempotency_lookups_total", "Idempotency-Key lookups by result.", ("result",))
+
+# Event loop
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer scheduled for now.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+
+_pools: Dict[str, object] = {}
+
+
+def _pool_state() -> Dict[Tuple[str, ...], float]:
+    state = {}
+    for name, engine in _pools.items():
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            continue
+        state[(name, "size")] = pool.size()
+        state[(name, "checked_out")] = pool.checkedout()
+        state[(name, "checked_in")] = pool.checkedin()
+        state[(name, "overflow")] = pool.overflow()
+    return state
+
+
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Database pool connections by state.", ("pool", "state"), callback=_pool_state
+)
+
+
+def instrument_engine(engine, pool_name: str = "primary") -> None:
+    """Count pool checkouts and new connections, and expose pool gauges."""
+    from sqlalchemy import event
+
+    event.listen(engine, "checkout", lambda *args: DB_POOL_CHECKOUTS.inc(pool_name))
+    event.listen(engine, "connect", lambda *args: DB_POOL_CONNECTIONS_OPENED.inc(pool_name))
+    _pools[pool_name] = engine
+
+
+async def monitor_event_loop_lag(interval_seconds: float = 0.5) -> None:
+    """Sample event-loop lag until cancelled."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval_seconds)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, time.perf_counter() - start - interval_seconds))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and status per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method, path)
+            HTTP_RESPONSES.inc(method, path, str(status_code))
@@ -1,8 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Boolean, Text, Float, LargeBinary, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
 
+# Full-text document of a room: name terms rank above description terms.
+# Search queries must use this exact expression to hit ix_rooms_search.
+ROOM_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -13,6 +20,7 @@ class User(Base):
     hashed_password = Column(String(255), nullable=False)
     full_name = Column(String(100))
     is_active = Column(Boolean, default=True)
+    is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -38,6 +46,16 @@ class Room(Base):
     creator = relationship("User", back_populates="created_rooms")
     participants = relationship("RoomParticipant", back_populates="room")
 
+    __table_args__ = (
+        # GET /rooms/search (PostgreSQL only; other databases scan)
+        Index(
+            "ix_rooms_search",
+            text(f"({ROOM_SEARCH_VECTOR})"),
+            postgresql_using="gin",
+            postgresql_where=text("is_active"),
+        ).ddl_if(dialect="postgresql"),
+    )
+
 
 class RoomParticipant(Base):
     __tablename__ = "room_participants"
@@ -52,3 +70,74 @@ class RoomParticipant(Base):
     # Relationships
     room = relationship("Room", back_populates="participants")
     user = relationship("User", back_populates="room_participants")
+
+    __table_args__ = (
+        # Room counts, join and leave look up participants by room (and user)
+        Index("ix_room_participants_room_id_user_id", "room_id", "user_id"),
+        # Scanned by the usage rollup job from its high-water mark
+        Index("ix_room_participants_left_at_id", "left_at", "id"),
+    )
+
+
+class UsageRollup(Base):
+    __tablename__ = "usage_rollups"
+
+    day = Column(Date, primary_key=True)
+    room_id = Column(Integer, ForeignKey("rooms.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    participant_seconds = Column(BigInteger, nullable=False, default=0)
+    sessions = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_usage_rollups_room_id_day", "room_id", "day"),
+        Index("ix_usage_rollups_user_id_day", "user_id", "day"),
+    )
+
+
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    # Last (left_at, id) pair folded into the rollup
+    high_water_mark = Column(DateTime(timezone=True), nullable=False)
+    last_id = Column(Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    # sha256 of method, path and body; reusing a key for another request is rejected
+    request_hash = Column(String(64), nullable=False)
+    # NULL while the first request is still running
+    status_code = Column(Integer)
+    response_body = Column(LargeBinary)
+    # Unix seconds; a pending row expires quickly so a crashed request can be retried
+    expires_at = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    # "<limit name>:<client IP or username>"
+    key = Column(String(255), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    # Unix seconds of the last refill
+    updated_at = Column(Float, nullable=False)
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True)
+    # One revoked token, or NULL to revoke all of user_id's tokens issued up to revoked_at
+    jti = Column(String(64), unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Unix seconds; workers load new revocations incrementally by revoked_at
+    revoked_at = Column(BigInteger, nullable=False, index=True)
+    expires_at = Column(BigInteger, nullable=False, index=True)
@@ -0,0 +1,209 @@
+"""Per-request statistical profiler.
+
+A profiled request gets a sampler thread that snapshots the stacks of the
+event-loop thread and the threadpool workers every few milliseconds. Idle
+threads are skipped. Samples are stored as collapsed stacks ("folded"
+format, one ``frame;frame;frame count`` line per stack), which flamegraph.pl,
+speedscope and inferno read directly. Files go into a bounded directory that
+acts as a ring buffer: the oldest profiles are deleted first.
+
+A profile covers the whole process for the duration of the request, and its
+root frame says where each sample came from:
+
+- ``request``: the event loop running this request's task
+- ``event-loop (other tasks)``: the event loop running anything else
+- ``threadpool (any request)``: a threadpool worker; sync routes and
+  dependencies run here, but so do other requests' at the same time
+
+So ``request`` is exact, while the threadpool part is only precise on a
+lightly loaded worker.
+"""
+
+import asyncio
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+
+# Leaf frames that mean "this thread is waiting, not working"
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+WORKER_THREAD_PREFIX = "AnyIO worker thread"
+
+# Only one request is profiled at a time per process
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> Optional[str]:
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+# Root frames of the folded stacks (see the module docstring)
+REQUEST_ROOT = "request"
+LOOP_ROOT = "event-loop (other tasks)"
+WORKER_ROOT = "threadpool (any request)"
+
+
+class RequestProfiler:
+    """Samples the event loop and threadpool on a background thread until stopped."""
+
+    def __init__(self, loop_thread_id: int, interval_seconds: float,
+                 task: Optional[asyncio.Task] = None):
+        self.loop_thread_id = loop_thread_id
+        self.interval_seconds = interval_seconds
+        # The request's task; loop samples taken while it runs are rooted at REQUEST_ROOT
+        self.task = task
+        self.loop = task.get_loop() if task is not None else None
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _targets(self) -> Dict[int, str]:
+        loop_root = LOOP_ROOT
+        if self.task is not None and asyncio.current_task(self.loop) is self.task:
+            loop_root = REQUEST_ROOT
+        targets = {self.loop_thread_id: loop_root}
+        for thread in threading.enumerate():
+            if thread.name.startswith(WORKER_THREAD_PREFIX):
+                targets[thread.ident] = WORKER_ROOT
+        return targets
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            targets = self._targets()
+            frames = sys._current_frames()
+            for thread_id, root in targets.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = _collapse(frame)
+                if stack is not None:
+                    self.samples[f"{root};{stack}"] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """Directory of folded profiles capped at max_files (oldest removed first)."""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+
+    @staticmethod
+    def new_name(method: str, path: str) -> str:
+        slug = path.strip("/").replace("/", "_") or "root"
+        return f"{time.time_ns()}-{method}-{slug}.folded"
+
+    def save(self, name: str, folded: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+            f.write(folded)
+
+        for old in self.list()[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, old["name"]))
+            except FileNotFoundError:
+                pass
+
+    def list(self) -> List[Dict]:
+        """Profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".folded"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            profiles.append({"name": name, "size": stat.st_size, "created_at": stat.st_mtime})
+        profiles.sort(key=lambda profile: profile["name"], reverse=True)
+        return profiles
+
+    def path_for(self, name: str) -> Optional[str]:
+        """Resolve a profile name from list(), rejecting anything else."""
+        if name not in {profile["name"] for profile in self.list()}:
+            return None
+        return os.path.join(self.directory, name)
+
+
+class ProfilerMiddleware:
+    """Pure ASGI middleware profiling requests with the admin header or by sampling.
+
+    Only installed when a token or sample rate is configured, so it costs
+    nothing otherwise.
+    """
+
+    def __init__(self, app, store: ProfileStore, token: Optional[str] = None,
+                 sample_rate: float = 0.0, interval_seconds: float = 0.001):
+        self.app = app
+        self.store = store
+        self.token = token.encode() if token else None
+        self.sample_rate = sample_rate
+        self.interval_seconds = interval_seconds
+
+    def _wanted(self, scope) -> bool:
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == b"x-profile" and hmac.compare_digest(value, self.token):
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope) or not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = RequestProfiler(threading.get_ident(), self.interval_seconds, asyncio.current_task())
+        name = self.store.new_name(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", name.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Joining the sampler and writing the file block, so not on the event loop
+            await run_in_threadpool(self._finish, profiler, name)
+
+    def _finish(self, profiler: RequestProfiler, name: str) -> None:
+        try:
+            profiler.stop()
+        finally:
+            _profile_lock.release()
+        try:
+            self.store.save(name, profiler.folded())
+        except OSError as e:
+            print(f"Profile save note: {str(e)}")
@@ -0,0 +1,112 @@
+"""Access token revocation.
+
+Tokens carry a ``jti`` (token id), ``uid`` (user id) and ``iat``. Revoking
+adds a row to ``revoked_tokens``: either one token (logout) or every token
+of a user issued up to now (deactivation). Each worker mirrors the
+unexpired rows in memory and picks up new ones incrementally by revoked_at,
+so the per-request check is a dict lookup and the auth path needs no
+database read. The worker that revokes applies it at once; the others within
+TOKEN_REVOCATION_REFRESH_SECONDS.
+
+Until a worker's first load succeeds it can't tell revoked tokens apart, so
+authentication answers 503 rather than accepting them.
+"""
+
+import time
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import SessionLocal
+from .models import RevokedToken
+
+# Revocations are re-read this far behind the newest one seen: a row commits
+# a little after its revoked_at (and workers' clocks differ slightly), so it
+# can become visible after a later one was read
+REFRESH_OVERLAP_SECONDS = 30
+# How often a worker drops expired entries from memory and the table
+PRUNE_INTERVAL_SECONDS = 300
+
+
+class RevocationList:
+    """This worker's copy of revoked_tokens."""
+
+    def __init__(self):
+        # jti -> token expiry (unix seconds)
+        self.jtis: Dict[str, int] = {}
+        # user id -> (tokens issued at or before this are revoked, entry expiry)
+        self.users: Dict[int, Tuple[int, int]] = {}
+        # Newest revoked_at loaded so far
+        self.revoked_through = 0
+        self.loaded = False
+        self.last_prune = 0.0
+
+    def is_revoked(self, jti: Optional[str], user_id: int, issued_at: int) -> bool:
+        if jti in self.jtis:
+            return True
+        revoked = self.users.get(user_id)
+        return revoked is not None and issued_at <= revoked[0]
+
+    def _apply(self, row: RevokedToken) -> None:
+        if row.jti is not None:
+            self.jtis[row.jti] = row.expires_at
+        else:
+            current = self.users.get(row.user_id)
+            if current is None or current[0] < row.revoked_at:
+                self.users[row.user_id] = (row.revoked_at, row.expires_at)
+
+    def revoke_token(self, db: Session, jti: str, user_id: int, expires_at: int) -> None:
+        """Revoke one token (e.g. on logout) until it would have expired."""
+        row = RevokedToken(jti=jti, user_id=user_id, revoked_at=int(time.time()), expires_at=expires_at)
+        db.add(row)
+        db.commit()
+        self._apply(row)
+
+    def revoke_user(self, db: Session, user_id: int) -> None:
+        """Revoke every token issued to a user so far (e.g. on deactivation).
+
+        Commits the session, so pending changes (the user's is_active) land
+        in the same transaction as the revocation.
+        """
+        now = int(time.time())
+        row = RevokedToken(
+            user_id=user_id,
+            revoked_at=now,
+            # Every token issued up to now has expired by then
+            expires_at=now + settings.access_token_expire_minutes * 60,
+        )
+        db.add(row)
+        db.commit()
+        self._apply(row)
+
+    def refresh(self, db: Session) -> int:
+        """Load revocations added since the last refresh; returns how many rows were read."""
+        now = int(time.time())
+        rows = db.query(RevokedToken).filter(
+            RevokedToken.revoked_at >= self.revoked_through - REFRESH_OVERLAP_SECONDS,
+            RevokedToken.expires_at > now,
+        ).all()
+        for row in rows:
+            self._apply(row)
+            self.revoked_through = max(self.revoked_through, row.revoked_at)
+        self.loaded = True
+
+        if time.monotonic() - self.last_prune >= PRUNE_INTERVAL_SECONDS:
+            self.last_prune = time.monotonic()
+            self.jtis = {jti: expires for jti, expires in self.jtis.items() if expires > now}
+            self.users = {user: entry for user, entry in self.users.items() if entry[1] > now}
+            db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+            db.commit()
+        return len(rows)
+
+
+# Singleton instance
+revocations = RevocationList()
+
+
+def refresh_revocations_job() -> None:
+    """Background entry point with its own session."""
+    db = SessionLocal()
+    try:
+        revocations.refresh(db)
+    finally:
+        db.close()
@@ -0,0 +1,150 @@
+"""Auto-close idle rooms.
+
+A room stays active until its creator deletes it, so abandoned rooms pile
+up in the active listings. The job closes rooms that have had no connected
+participant for ROOM_IDLE_SECONDS: nobody connected now, nobody left within
+the idle period, and created before it. Each batch is one UPDATE ... RETURNING
+over at most ROOM_CLOSE_BATCH_SIZE rooms, committed on its own so a large
+backlog never holds long locks.
+
+Each pass first disconnects participant rows left connected in inactive rooms
+(rooms deleted before DELETE /rooms/{id} closed them). Their left_at is the
+time of the pass: the usage rollup picks up sessions by (left_at, id) past its
+watermark, so an earlier timestamp would be skipped and never counted.
+
+The rooms' LiveKit deletions go through room_deletions, a queue drained by
+LIVEKIT_DELETE_CONCURRENCY tasks on the event loop, so a large batch does not
+open hundreds of RPCs at once. Shutdown waits up to SHUTDOWN_FLUSH_SECONDS
+for the queue; rooms it misses are empty, and LiveKit closes those itself
+after its empty timeout.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.orm import Session
+from .config import settings
+from .database import SessionLocal
+from .livekit_service import livekit_service
+from .metrics import LIVEKIT_DELETIONS_PENDING, ROOMS_CLOSED
+from .models import Room, RoomParticipant
+
+# Kept short: the server has already spent its drain time on requests
+SHUTDOWN_FLUSH_SECONDS = 5
+
+
+class RoomDeletionQueue:
+    """LiveKit room deletions run by a fixed number of tasks on the event loop."""
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+
+    def start(self, concurrency: int) -> None:
+        """Start the workers on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(max(1, concurrency))]
+
+    def put(self, room_names: List[str]) -> None:
+        """Enqueue LiveKit rooms for deletion; safe to call from worker threads."""
+        if self._loop is None or not room_names:
+            return
+        self._loop.call_soon_threadsafe(self._put_all, room_names)
+
+    def _put_all(self, room_names: List[str]) -> None:
+        for name in room_names:
+            self._queue.put_nowait(name)
+        LIVEKIT_DELETIONS_PENDING.set(self._queue.qsize())
+
+    async def _work(self) -> None:
+        while True:
+            name = await self._queue.get()
+            try:
+                await livekit_service.delete_room(name)
+            finally:
+                self._queue.task_done()
+                LIVEKIT_DELETIONS_PENDING.set(self._queue.qsize())
+
+    async def aclose(self, timeout: float) -> None:
+        """Wait up to timeout for queued deletions, then stop the workers."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Room cleanup note: {self._queue.qsize()} LiveKit deletions left at shutdown")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._queue = None
+        self._loop = None
+        self._workers = []
+
+
+# Singleton instance
+room_deletions = RoomDeletionQueue()
+
+
+def close_idle_rooms(db: Session, idle_seconds: float, batch_size: int = 500) -> List[str]:
+    """Deactivate rooms idle for idle_seconds; returns their LiveKit room names."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=idle_seconds)
+    recent = exists().where(
+        RoomParticipant.room_id == Room.id,
+        (RoomParticipant.is_connected == True) | (RoomParticipant.left_at >= cutoff),
+    )
+    idle = select(Room.id).where(
+        Room.is_active == True,
+        Room.created_at < cutoff,
+        ~recent,
+    ).order_by(Room.id).limit(batch_size).correlate(None).scalar_subquery()
+
+    closed = []
+    while True:
+        # Conditions are repeated so a room joined since the subquery ran is kept
+        names = db.execute(
+            update(Room)
+            .where(Room.id.in_(idle), Room.is_active == True, ~recent)
+            .values(is_active=False)
+            .returning(Room.room_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.commit()
+        closed.extend(names)
+        if len(names) < batch_size:
+            return closed
+
+
+def close_dangling_participants(db: Session, batch_size: int = 500) -> int:
+    """Disconnect participant rows still connected to inactive rooms; returns how many."""
+    dangling = select(RoomParticipant.id).join(Room, Room.id == RoomParticipant.room_id).where(
+        RoomParticipant.is_connected == True,
+        Room.is_active == False,
+    ).order_by(RoomParticipant.id).limit(batch_size).correlate(None).scalar_subquery()
+
+    total = 0
+    while True:
+        count = db.execute(
+            update(RoomParticipant)
+            .where(RoomParticipant.id.in_(dangling))
+            .values(is_connected=False, left_at=func.now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        total += count
+        if count < batch_size:
+            return total
+
+
+def close_idle_rooms_job() -> None:
+    """Background entry point with its own session."""
+    db = SessionLocal()
+    try:
+        close_dangling_participants(db, settings.room_close_batch_size)
+        names = close_idle_rooms(db, settings.room_idle_seconds, settings.room_close_batch_size)
+        ROOMS_CLOSED.inc("idle", amount=len(names))
+    finally:
+        db.close()
+    room_deletions.put(names)
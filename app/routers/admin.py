@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+from functools import lru_cache
+from typing import List
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..database import SessionLocal, get_db
+from ..models import User, Room, RoomParticipant
+from ..schemas import ExportFormat, BulkImportResult, ProfileInfo
+from ..auth import get_current_admin_user
+from ..bulk_import import import_users_csv
+from ..config import settings
+from ..profiling import ProfileStore
+from ..revocation import revocations
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+# Rows fetched per server-side cursor round trip (and per response chunk)
+EXPORT_BATCH_SIZE = 1000
+
+
+@lru_cache
+def profile_store() -> ProfileStore:
+    """The profile directory, created on first use so import reads no settings."""
+    return ProfileStore(settings.profiler_dir, settings.profiler_max_files)
+
+ROOM_EXPORT_COLUMNS = (
+    Room.id,
+    Room.room_id,
+    Room.name,
+    Room.description,
+    Room.creator_id,
+    Room.is_active,
+    Room.max_participants,
+    Room.created_at,
+    Room.updated_at,
+)
+
+PARTICIPATION_EXPORT_COLUMNS = (
+    RoomParticipant.id,
+    RoomParticipant.room_id,
+    RoomParticipant.user_id,
+    RoomParticipant.joined_at,
+    RoomParticipant.left_at,
+    RoomParticipant.is_connected,
+)
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _stream_export(columns, fmt: ExportFormat):
+    """Yield the export one cursor batch at a time.
+
+    The generator owns its session because it outlives the request handler;
+    yield_per makes the driver use a server-side cursor so only one batch is
+    ever held in memory.
+    """
+    names = [column.key for column in columns]
+    statement = select(*columns).order_by(columns[0]).execution_options(
+        yield_per=EXPORT_BATCH_SIZE
+    )
+
+    db = SessionLocal()
+    try:
+        result = db.execute(statement)
+        if fmt == ExportFormat.csv:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            for partition in result.partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            for partition in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(names, row)), default=_json_default) + "\n"
+                    for row in partition
+                )
+    finally:
+        db.close()
+
+
+def _export_response(db: Session, columns, fmt: ExportFormat, name: str) -> StreamingResponse:
+    # Return the request's connection now rather than after the whole stream
+    db.close()
+    media_type = "text/csv" if fmt == ExportFormat.csv else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_export(columns, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt.value}"'},
+    )
+
+
+@router.get("/export/rooms")
+def export_rooms(
+    format: ExportFormat = ExportFormat.ndjson,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Stream every room (active or not) as NDJSON or CSV."""
+    return _export_response(db, ROOM_EXPORT_COLUMNS, format, "rooms")
+
+
+@router.get("/export/participations")
+def export_participations(
+    format: ExportFormat = ExportFormat.ndjson,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Stream every room participation record as NDJSON or CSV."""
+    return _export_response(db, PARTICIPATION_EXPORT_COLUMNS, format, "participations")
+
+
+@router.post("/users/import", response_model=BulkImportResult)
+def import_users(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk-create users from a CSV upload and report per-row errors."""
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return import_users_csv(db, stream)
+    finally:
+        stream.detach()
+
+
+@router.post("/users/{user_id}/deactivate")
+def deactivate_user(
+    user_id: int,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Deactivate a user and revoke every access token issued to them."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    user.is_active = False
+    # Committed together with the revocation
+    revocations.revoke_user(db, user_id)
+    return {"message": "User deactivated"}
+
+
+@router.get("/profiles", response_model=List[ProfileInfo])
+def list_profiles(current_user: User = Depends(get_current_admin_user)):
+    """List stored request profiles, newest first."""
+    return profile_store().list()
+
+
+@router.get("/profiles/{name}")
+def download_profile(name: str, current_user: User = Depends(get_current_admin_user)):
+    """Download a profile in collapsed-stack (flamegraph) format."""
+    path = profile_store().path_for(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
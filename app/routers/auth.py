@@ -6,19 +6,25 @@ from ..database import get_db
 from ..models import User
 from ..schemas import UserCreate, User as UserSchema, Token
 from ..auth import (
+    Principal,
     authenticate_user,
     create_access_token,
     get_password_hash,
-    get_current_active_user,
+    get_current_principal,
+    get_current_user,
 )
 from ..config import settings
+from ..admission import admit_login, admit_register
+from ..revocation import revocations
+from ..serialization import json_response
+from .users import user_encoder
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 
-@router.post("/register", response_model=UserSchema)
+@router.post("/register", response_model=UserSchema, dependencies=[Depends(admit_register)])
 def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    """Register a new user."""
+    """Register a new user (rate-limited per client IP)."""
     # Check if user already exists
     db_user = db.query(User).filter(User.email == user.email).first()
     if db_user:
@@ -50,12 +56,12 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(admit_login)])
 def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    """Login and get access token."""
+    """Login and get access token (rate-limited per client IP and username)."""
     user = authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
@@ -63,16 +69,29 @@ def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
     
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username, "uid": user.id}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@router.post("/logout")
+def logout(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Revoke the access token used for this request."""
+    if principal.jti is not None:
+        revocations.revoke_token(db, principal.jti, principal.id, principal.expires_at)
+    return {"message": "Successfully logged out"}
+
+
 @router.get("/me", response_model=UserSchema)
-def read_users_me(current_user: User = Depends(get_current_active_user)):
+def read_users_me(current_user: User = Depends(get_current_user)):
     """Get current user information."""
-    return current_user
+    return json_response(user_encoder.to_dict(current_user))
@@ -0,0 +1,56 @@
+import asyncio
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from ..database import get_read_db, release_session
+from ..models import User
+from ..schemas import Lobby
+from ..auth import get_current_user
+from ..livekit_service import livekit_service
+from ..serialization import json_response
+from .rooms import query_rooms, room_encoder
+from .users import user_encoder
+
+router = APIRouter(prefix="/lobby", tags=["lobby"])
+
+# Concurrent LiveKit ListParticipants calls per lobby request
+LIVE_PARTICIPANTS_CONCURRENCY = 10
+# Each room in the page may cost one ListParticipants call
+MAX_LOBBY_ROOMS = 100
+
+
+@router.get("", response_model=Lobby)
+async def get_lobby(
+    limit: int = Query(20, ge=1, le=MAX_LOBBY_ROOMS),
+    include_participants: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get everything the client needs at startup in one request.
+
+    Returns the current user and the first page of active rooms with counts
+    and creators (one query). With `include_participants=true` each room also
+    carries its live LiveKit participants, fetched concurrently.
+    """
+    def load_rooms():
+        try:
+            return query_rooms(db, room_encoder, 0, limit)
+        finally:
+            # Don't hold a connection across the LiveKit fan-out below
+            release_session(db)
+
+    rooms = await run_in_threadpool(load_rooms)
+
+    if include_participants and rooms:
+        semaphore = asyncio.Semaphore(LIVE_PARTICIPANTS_CONCURRENCY)
+
+        async def fetch(room):
+            async with semaphore:
+                room["live_participants"] = await livekit_service.get_room_participants(room["room_id"])
+
+        await asyncio.gather(*(fetch(room) for room in rooms))
+
+    return json_response({
+        "user": user_encoder.to_dict(current_user),
+        "rooms": rooms,
+    })
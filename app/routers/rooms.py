@@ -1,35 +1,61 @@
-from typing import List
+from datetime import date
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from ..database import get_db
-from ..models import User, Room, RoomParticipant
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import Float, cast, func
+from ..database import get_db, get_read_db, release_session
+from ..models import User, Room, RoomParticipant, UsageRollup
 from ..schemas import (
     RoomCreate,
     Room as RoomSchema,
     RoomWithParticipants,
+    RoomSearchPage,
     LiveKitTokenRequest,
-    LiveKitTokenResponse
+    LiveKitTokenResponse,
+    RoomUsageStats
 )
-from ..auth import get_current_active_user
+from ..auth import Principal, get_current_active_user
 from ..livekit_service import livekit_service
+from ..usage import usage_stats, default_window
+from ..serialization import SchemaEncoder, column_attrs, json_response, parse_fields
+from ..idempotency import IdempotentRequest, idempotency_key
+from ..search import after_cursor, decode_cursor, encode_cursor, match_and_rank, search_terms
 import uuid
+import orjson
 
 router = APIRouter(prefix="/rooms", tags=["rooms"])
 
+room_encoder = SchemaEncoder(RoomWithParticipants)
+created_room_encoder = SchemaEncoder(RoomSchema)
+
+# The async routes below await LiveKit. Their database work runs in the
+# threadpool and the session is released before each await, so the event loop
+# never waits on a connection and none is held idle during the RPC (with the
+# in-memory SQLite pool, that would block every other request).
+
 
 @router.post("/", response_model=RoomSchema)
 async def create_room(
     room: RoomCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    idempotency: IdempotentRequest = Depends(idempotency_key)
 ):
-    """Create a new room."""
+    """Create a new room.
+
+    Send an `Idempotency-Key` header to make retries safe: a retry with the
+    same key returns the room created by the first request.
+    """
+    if idempotency.replay is not None:
+        return idempotency.replay
+
     # Generate unique room ID
     room_id = f"room_{uuid.uuid4().hex[:8]}"
     
     try:
         # Create room in LiveKit
+        await run_in_threadpool(release_session, db)
         livekit_room = await livekit_service.create_room(room_id)
         
         # Create room in database
@@ -40,83 +66,177 @@ async def create_room(
             creator_id=current_user.id,
             max_participants=room.max_participants
         )
-        
-        db.add(db_room)
-        db.commit()
-        db.refresh(db_room)
-        
-        return db_room
-        
+        await run_in_threadpool(_insert, db, db_room)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create room: {str(e)}"
         )
 
+    return await run_in_threadpool(
+        idempotency.save, json_response(created_room_encoder.to_dict(db_room))
+    )
+
+
+def _insert(db: Session, row) -> None:
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+
 
 @router.get("/", response_model=List[RoomWithParticipants])
 def list_rooms(
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
 ):
-    """List all active rooms with participant counts."""
-    rooms = db.query(
-        Room,
-        func.count(RoomParticipant.id).label("participants_count")
-    ).outerjoin(
-        RoomParticipant,
-        (Room.id == RoomParticipant.room_id) & (RoomParticipant.is_connected == True)
-    ).filter(
-        Room.is_active == True
-    ).group_by(Room.id).offset(skip).limit(limit).all()
+    """List all active rooms with participant counts.
+
+    `fields` (comma-separated) limits the response to those fields; the
+    participant count and creator are only queried when requested.
+    """
+    encoder = room_encoder.only(parse_fields(fields, room_encoder))
+    return json_response(query_rooms(db, encoder, skip, limit))
+
+
+def room_query(db: Session, encoder: SchemaEncoder):
+    """Query for rooms plus the extra columns the encoder needs; returns (query, extra names)."""
+    query = db.query(Room).options(load_only(*column_attrs(Room, encoder.fields)))
+    extras = []
+    if "participants_count" in encoder.fields:
+        query = query.add_columns(
+            func.count(RoomParticipant.id).label("participants_count")
+        ).outerjoin(
+            RoomParticipant,
+            (Room.id == RoomParticipant.room_id) & (RoomParticipant.is_connected == True)
+        ).group_by(Room.id)
+        extras.append("participants_count")
+    if "creator" in encoder.fields:
+        query = query.add_entity(User).outerjoin(
+            User, Room.creator_id == User.id
+        ).options(load_only(*column_attrs(User, encoder.nested["creator"].fields)))
+        if extras:
+            query = query.group_by(User.id)
+        extras.append("creator")
+    return query, extras
+
+
+def query_rooms(db: Session, encoder: SchemaEncoder, skip: int, limit: int) -> List[dict]:
+    """Fetch a page of active rooms in one query, encoded with the given room encoder."""
+    query, extras = room_query(db, encoder)
+    rows = query.filter(Room.is_active == True).offset(skip).limit(limit).all()
     
     result = []
-    for room, participants_count in rooms:
-        creator = db.query(User).filter(User.id == room.creator_id).first()
-        room_data = RoomWithParticipants(
-            **room.__dict__,
-            participants_count=participants_count,
-            creator=creator
-        )
-        result.append(room_data)
+    for row in rows:
+        room, values = (row[0], dict(zip(extras, row[1:]))) if extras else (row, {})
+        result.append(encoder.to_dict(room, **values))
     
     return result
 
 
+@router.get("/search", response_model=RoomSearchPage)
+def search_rooms(
+    q: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """Search active rooms by name and description, best matches first.
+
+    Every word of `q` must match the start of a word in the room's name or
+    description (anywhere in them on databases without full-text search), so
+    partial input works for typeahead. Results come in pages
+    of `limit` (at most 100); pass `next_cursor` back as `cursor` for the
+    next page. `fields` works as in the room listing.
+    """
+    encoder = room_encoder.only(parse_fields(fields, room_encoder))
+    limit = max(1, min(limit, 100))
+    after = decode_cursor(cursor)
+    terms = search_terms(q)
+    if not terms:
+        return json_response({"items": [], "next_cursor": None})
+
+    # Rank and page on the ids alone, then load the page's rooms and extras
+    match, rank = match_and_rank(db.get_bind().dialect.name, terms)
+    rank = cast(rank, Float)
+    page = db.query(Room.id.label("id"), rank.label("rank")).filter(Room.is_active == True, match)
+    if after is not None:
+        page = page.filter(after_cursor(rank, after))
+    page = page.order_by(rank.desc(), Room.id.desc()).limit(limit + 1).subquery()
+
+    query, extras = room_query(db, encoder)
+    if "participants_count" in extras:
+        query = query.group_by(page.c.rank)
+    rows = query.join(page, page.c.id == Room.id).add_columns(page.c.rank).order_by(
+        page.c.rank.desc(), Room.id.desc()
+    ).all()
+
+    items = []
+    for room, *values, room_rank in rows[:limit]:
+        items.append(encoder.to_dict(room, **dict(zip(extras, values))))
+    next_cursor = None
+    if len(rows) > limit:
+        room, *_, room_rank = rows[limit - 1]
+        next_cursor = encode_cursor(room_rank, room.id)
+    return json_response({"items": items, "next_cursor": next_cursor})
+
+
 @router.get("/{room_id}", response_model=RoomWithParticipants)
 def get_room(
     room_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
 ):
-    """Get a specific room by ID."""
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
+    """Get a specific room by ID (optionally only the given `fields`)."""
+    encoder = room_encoder.only(parse_fields(fields, room_encoder))
+    query = db.query(Room).options(load_only(*column_attrs(Room, encoder.fields)))
+    want_creator = "creator" in encoder.fields
+    if want_creator:
+        query = query.add_entity(User).outerjoin(
+            User, Room.creator_id == User.id
+        ).options(load_only(*column_attrs(User, encoder.nested["creator"].fields)))
+
+    row = query.filter(Room.id == room_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Room not found")
+    room, values = (row[0], {"creator": row[1]}) if want_creator else (row, {})
     
-    participants_count = db.query(RoomParticipant).filter(
-        RoomParticipant.room_id == room_id,
-        RoomParticipant.is_connected == True
-    ).count()
+    if "participants_count" in encoder.fields:
+        values["participants_count"] = db.query(RoomParticipant).filter(
+            RoomParticipant.room_id == room_id,
+            RoomParticipant.is_connected == True
+        ).count()
     
-    creator = db.query(User).filter(User.id == room.creator_id).first()
-    
-    return RoomWithParticipants(
-        **room.__dict__,
-        participants_count=participants_count,
-        creator=creator
-    )
+    return json_response(encoder.to_dict(room, **values))
 
 
 @router.post("/{room_id}/join", response_model=LiveKitTokenResponse)
-async def join_room(
+def join_room(
     room_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_db),
+    idempotency: IdempotentRequest = Depends(idempotency_key)
 ):
-    """Join a room and get LiveKit access token."""
+    """Join a room and get LiveKit access token.
+
+    Honors `Idempotency-Key` like room creation: a retry joins the same room
+    without adding another participant, and gets a freshly minted token.
+    """
+    if idempotency.replay is not None:
+        # Only the room is stored, so no token sits in the idempotency table
+        room_name = orjson.loads(idempotency.replay.body).get("room_name")
+        if room_name is None:
+            # Stored before join tokens were minted on replay
+            return idempotency.replay
+        response = _join_response(room_name, current_user.username)
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
     room = db.query(Room).filter(Room.id == room_id).first()
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
@@ -141,29 +261,34 @@ async def join_room(
         db.add(participant)
         db.commit()
     
+    response = _join_response(room.room_id, current_user.username)
+    idempotency.save(json_response({"room_name": room.room_id}))
+    return response
+
+
+def _join_response(room_name: str, username: str):
     # Generate LiveKit token
     try:
         token = livekit_service.generate_access_token(
-            room_name=room.room_id,
-            participant_name=current_user.username
-        )
-        
-        return LiveKitTokenResponse(
-            token=token,
-            room_url=f"{livekit_service.livekit_url}?token={token}"
+            room_name=room_name,
+            participant_name=username
         )
-        
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate access token: {str(e)}"
         )
 
+    return json_response({
+        "token": token,
+        "room_url": f"{livekit_service.livekit_url}?token={token}"
+    })
+
 
 @router.post("/{room_id}/leave")
 def leave_room(
     room_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Leave a room."""
@@ -186,27 +311,15 @@ def leave_room(
 @router.delete("/{room_id}")
 async def delete_room(
     room_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Delete a room (only creator can delete)."""
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
-    
-    if room.creator_id != current_user.id:
-        raise HTTPException(
-            status_code=403,
-            detail="Only the room creator can delete the room"
-        )
+    room_name = await run_in_threadpool(_deactivate_room, db, room_id, current_user.id)
     
     try:
         # Delete room from LiveKit
-        await livekit_service.delete_room(room.room_id)
-        
-        # Mark room as inactive in database
-        room.is_active = False
-        db.commit()
+        await livekit_service.delete_room(room_name)
         
         return {"message": "Room deleted successfully"}
         
@@ -217,19 +330,42 @@ async def delete_room(
         )
 
 
+def _deactivate_room(db: Session, room_id: int, user_id: int) -> str:
+    """Mark the creator's room inactive and disconnect its participants; returns its LiveKit name."""
+    try:
+        room = db.query(Room).filter(Room.id == room_id).first()
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+        
+        if room.creator_id != user_id:
+            raise HTTPException(
+                status_code=403,
+                detail="Only the room creator can delete the room"
+            )
+        
+        room_name = room.room_id
+        room.is_active = False
+        db.query(RoomParticipant).filter(
+            RoomParticipant.room_id == room_id,
+            RoomParticipant.is_connected == True
+        ).update({"is_connected": False, "left_at": func.now()}, synchronize_session=False)
+        db.commit()
+        return room_name
+    finally:
+        release_session(db)
+
+
 @router.get("/{room_id}/participants")
 async def get_room_participants(
     room_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get participants in a room from LiveKit."""
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
+    room_name = await run_in_threadpool(_livekit_name, db, room_id)
     
     try:
-        participants = await livekit_service.get_room_participants(room.room_id)
+        participants = await livekit_service.get_room_participants(room_name)
         return {"participants": participants}
         
     except Exception as e:
@@ -237,3 +373,31 @@ async def get_room_participants(
             status_code=500,
             detail=f"Failed to get participants: {str(e)}"
         )
+
+
+def _livekit_name(db: Session, room_id: int) -> str:
+    try:
+        room = db.query(Room.room_id).filter(Room.id == room_id).first()
+    finally:
+        release_session(db)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    return room.room_id
+
+
+@router.get("/{room_id}/stats", response_model=RoomUsageStats)
+def get_room_stats(
+    room_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get participant-minutes per day for a room (defaults to the last 30 days)."""
+    room = db.query(Room.id).filter(Room.id == room_id).first()
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    start, end = default_window(start, end)
+    stats = usage_stats(db, UsageRollup.room_id, room_id, start, end)
+    return RoomUsageStats(room_id=room_id, **stats)
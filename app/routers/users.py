@@ -1,34 +1,65 @@
-from typing import List
+from datetime import date
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models import User
-from ..schemas import User as UserSchema
-from ..auth import get_current_active_user
+from sqlalchemy.orm import Session, load_only
+from ..database import get_read_db
+from ..models import User, UsageRollup
+from ..schemas import User as UserSchema, UserUsageStats
+from ..auth import Principal, get_current_active_user
+from ..usage import usage_stats, default_window
+from ..serialization import SchemaEncoder, column_attrs, json_response, parse_fields
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+user_encoder = SchemaEncoder(UserSchema)
+
 
 @router.get("/", response_model=List[UserSchema])
 def list_users(
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
 ):
-    """List all users."""
-    users = db.query(User).filter(User.is_active == True).offset(skip).limit(limit).all()
-    return users
+    """List all users (optionally only the given comma-separated `fields`)."""
+    encoder = user_encoder.only(parse_fields(fields, user_encoder))
+    users = db.query(User).options(
+        load_only(*column_attrs(User, encoder.fields))
+    ).filter(User.is_active == True).offset(skip).limit(limit).all()
+    return json_response(encoder.to_dicts(users))
 
 
 @router.get("/{user_id}", response_model=UserSchema)
 def get_user(
     user_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    current_user: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get a specific user by ID (optionally only the given `fields`)."""
+    encoder = user_encoder.only(parse_fields(fields, user_encoder))
+    user = db.query(User).options(
+        load_only(*column_attrs(User, encoder.fields))
+    ).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return json_response(encoder.to_dict(user))
+
+
+@router.get("/{user_id}/stats", response_model=UserUsageStats)
+def get_user_stats(
+    user_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: Principal = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
 ):
-    """Get a specific user by ID."""
-    user = db.query(User).filter(User.id == user_id).first()
+    """Get participant-minutes per day for a user (defaults to the last 30 days)."""
+    user = db.query(User.id).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+
+    start, end = default_window(start, end)
+    stats = usage_stats(db, UsageRollup.user_id, user_id, start, end)
+    return UserUsageStats(user_id=user_id, **stats)
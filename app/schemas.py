@@ -1,6 +1,7 @@
+from enum import Enum
 from pydantic import BaseModel, EmailStr, ConfigDict
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 
 
 # User Schemas
@@ -66,6 +67,12 @@ class RoomWithParticipants(Room):
     creator: User
 
 
+class RoomSearchPage(BaseModel):
+    items: List[RoomWithParticipants]
+    # Pass as `cursor` to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
 # Authentication Schemas
 class Token(BaseModel):
     access_token: str
@@ -85,3 +92,68 @@ class LiveKitTokenRequest(BaseModel):
 class LiveKitTokenResponse(BaseModel):
     token: str
     room_url: str
+
+
+# Lobby Schemas
+class LiveParticipant(BaseModel):
+    identity: str
+    name: str
+    sid: str
+    joined_at: int
+    state: str
+
+
+class LobbyRoom(RoomWithParticipants):
+    live_participants: Optional[List[LiveParticipant]] = None
+
+
+class Lobby(BaseModel):
+    user: User
+    rooms: List[LobbyRoom]
+
+
+# Usage Schemas
+class UsageDay(BaseModel):
+    day: date
+    participant_minutes: float
+    sessions: int
+
+
+class UsageStats(BaseModel):
+    start: date
+    end: date
+    total_participant_minutes: float
+    total_sessions: int
+    days: List[UsageDay]
+
+
+class RoomUsageStats(UsageStats):
+    room_id: int
+
+
+class UserUsageStats(UsageStats):
+    user_id: int
+
+
+# Admin Schemas
+class BulkImportError(BaseModel):
+    row: int
+    username: Optional[str] = None
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    errors: List[BulkImportError]
+
+
+class ProfileInfo(BaseModel):
+    name: str
+    size: int
+    created_at: float
+
+
+# Export Schemas
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
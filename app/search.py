@@ -0,0 +1,72 @@
+"""Room search: match and rank expressions, and keyset cursors.
+
+On PostgreSQL rooms are matched with full-text search against
+ROOM_SEARCH_VECTOR, the expression the GIN index ix_rooms_search is built
+on (room names weighted above descriptions), so a search reads only the
+matching index entries however large the table is. Every term is a prefix
+match (``term:*``), which gives typeahead while the user is still typing.
+Other databases fall back to case-insensitive substring matching with a
+simple name-first ranking and no index.
+
+Pages are ordered by (rank, id) descending; the cursor is the last row's
+pair, so the next page is a keyset seek rather than an OFFSET.
+"""
+
+import base64
+import re
+from typing import List, Optional, Tuple
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import case, func, literal_column, or_, and_
+from .models import ROOM_SEARCH_VECTOR, Room
+
+MAX_SEARCH_TERMS = 8
+
+_TERM = re.compile(r"\w+")
+
+
+def search_terms(q: str) -> List[str]:
+    """Lower-cased word terms of a query (punctuation is ignored)."""
+    return _TERM.findall(q.lower())[:MAX_SEARCH_TERMS]
+
+
+def match_and_rank(dialect_name: str, terms: List[str]):
+    """(WHERE clause, rank expression) for rooms matching every term."""
+    if dialect_name == "postgresql":
+        vector = literal_column(f"({ROOM_SEARCH_VECTOR})")
+        query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        return vector.op("@@")(query), func.ts_rank(vector, query)
+
+    name = func.lower(Room.name)
+    description = func.lower(func.coalesce(Room.description, ""))
+    clauses, ranks = [], []
+    for term in terms:
+        clauses.append(or_(name.contains(term, autoescape=True), description.contains(term, autoescape=True)))
+        ranks.append(case(
+            (name.startswith(term, autoescape=True), 1.0),
+            (name.contains(term, autoescape=True), 0.6),
+            else_=0.2,
+        ))
+    return and_(*clauses), sum(ranks[1:], ranks[0])
+
+
+def after_cursor(rank, cursor: Optional[Tuple[float, int]]):
+    """Keyset condition for rows after the cursor in (rank, id) descending order."""
+    if cursor is None:
+        return None
+    last_rank, last_id = cursor
+    return or_(rank < last_rank, and_(rank == last_rank, Room.id < last_id))
+
+
+def encode_cursor(rank: float, room_id: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([rank, room_id])).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    if not cursor:
+        return None
+    try:
+        rank, room_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(room_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,46 @@
+"""Production entry point.
+
+    python -m app.server
+
+Runs uvicorn with one worker process per available CPU (or WEB_CONCURRENCY),
+uvloop and httptools when installed, a keep-alive longer than typical load
+balancer idle timeouts, and a bounded graceful shutdown. On SIGTERM uvicorn
+stops accepting connections, lets in-flight requests finish for up to
+GRACEFUL_SHUTDOWN_SECONDS, then runs the lifespan shutdown, which stops the
+background jobs, flushes the span exporter and closes the LiveKit client and
+database pools.
+
+For local development use `python -m app.main` (auto-reload when DEBUG=true).
+"""
+
+import importlib.util
+from .config import settings
+from .system import available_cpus
+
+
+def main() -> None:
+    import uvicorn
+
+    workers = settings.web_concurrency or available_cpus()
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    print(f"Starting {workers} worker(s) on {settings.host}:{settings.port} ({loop}, {http})")
+
+    uvicorn.run(
+        "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.backlog,
+        timeout_keep_alive=settings.keep_alive_seconds,
+        timeout_graceful_shutdown=settings.graceful_shutdown_seconds,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.forwarded_allow_ips,
+        access_log=settings.access_log,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""What the process may use of the machine it runs on."""
+
+import os
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects container CPU sets)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
@@ -0,0 +1,325 @@
+"""Lightweight request tracing with an OTLP/JSON exporter.
+
+Every HTTP request gets a root span and a W3C ``traceparent`` response
+header. Sampling is decided once at the root; unsampled requests only pay
+for a context-variable lookup per instrumented call. An incoming
+``traceparent`` always carries its trace id over, but its sampled flag is
+only honoured from trusted clients (TRACING_TRUSTED_PARENTS), so anyone else
+can't force every request of theirs to be traced. Sampled spans are batched
+on a background thread and written as OTLP/JSON lines to a size-capped,
+rotated file and/or POSTed to an OTLP/HTTP collector (e.g.
+``http://localhost:4318/v1/traces``).
+"""
+
+import ipaddress
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+SERVICE_NAME = "livekit-backend"
+MAX_STATEMENT_LENGTH = 1000
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_exporter: Optional["SpanExporter"] = None
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, attributes: Optional[Dict] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.sampled and _exporter is not None:
+            _exporter.export(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, **attributes):
+    """Record a child of the current span; a no-op outside sampled requests."""
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        yield None
+        return
+
+    span = Span(name, parent.trace_id, parent.span_id, True, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.end(e)
+        raise
+    else:
+        span.end()
+    finally:
+        _current_span.reset(token)
+
+
+def _parse_traceparent(value: str):
+    """Return (trace_id, parent_span_id, sampled) from a W3C traceparent header."""
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+# SQLAlchemy instrumentation
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None or not parent.sampled or context is None:
+        return
+    context._trace_span = Span("db.query", parent.trace_id, parent.span_id, True, {
+        "db.system": conn.dialect.name,
+        "db.statement": statement[:MAX_STATEMENT_LENGTH],
+    })
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.set_attribute("db.rows", cursor.rowcount)
+        span.end()
+        context._trace_span = None
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.end(exception_context.original_exception)
+        exception_context.execution_context._trace_span = None
+
+
+def trace_engine(engine) -> None:
+    """Record a child span for every statement executed on the engine."""
+    from sqlalchemy import event
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# Export
+
+class SpanExporter:
+    """Batches finished spans on a background thread and writes OTLP/JSON."""
+
+    def __init__(self, path: Optional[str] = None, endpoint: Optional[str] = None,
+                 max_queue: int = 10000, batch_size: int = 512, interval_seconds: float = 1.0,
+                 max_bytes: int = 100 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Flush queued spans and stop the exporter thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.interval_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    print(f"Trace export note: {str(e)}")
+
+    def _write(self, batch: List[Span]) -> None:
+        payload = json.dumps(_to_otlp(batch), separators=(",", ":"))
+        if self.path:
+            try:
+                if os.path.getsize(self.path) >= self.max_bytes:
+                    # Keep one previous file, so the export never exceeds 2 x max_bytes
+                    os.replace(self.path, self.path + ".1")
+            except FileNotFoundError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(payload + "\n")
+        if self.endpoint:
+            request = urllib.request.Request(
+                self.endpoint,
+                data=payload.encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=5) as response:
+                response.read()
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _to_otlp(spans: List[Span]) -> Dict:
+    otlp_spans = []
+    for span in spans:
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            # SERVER for request roots, INTERNAL for everything else
+            "kind": 2 if span.name.startswith("HTTP ") else 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        otlp_spans.append(otlp_span)
+
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": otlp_spans}],
+    }]}
+
+
+def start_exporter(path: Optional[str], endpoint: Optional[str], max_bytes: int = 100 * 1024 * 1024) -> None:
+    global _exporter
+    if _exporter is None and (path or endpoint):
+        _exporter = SpanExporter(path=path, endpoint=endpoint, max_bytes=max_bytes)
+
+
+def shutdown_exporter() -> None:
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a root span per request.
+
+    trusted_parents lists the clients (IPs or CIDRs, or "*") whose sampled
+    traceparent is honoured; other requests are sampled at sample_rate.
+    """
+
+    def __init__(self, app, sample_rate: float = 0.0, trusted_parents: str = ""):
+        self.app = app
+        self.sample_rate = sample_rate
+        entries = [entry.strip() for entry in trusted_parents.split(",") if entry.strip()]
+        self.trust_all = "*" in entries
+        self.trusted = [ipaddress.ip_network(entry, strict=False) for entry in entries if entry != "*"]
+
+    def _trusted(self, scope) -> bool:
+        if self.trust_all:
+            return True
+        client = scope.get("client")
+        if not self.trusted or not client:
+            return False
+        try:
+            address = ipaddress.ip_address(client[0])
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                incoming = _parse_traceparent(value.decode("latin-1"))
+                break
+
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+            sampled = (sampled and self._trusted(scope)) or random.random() < self.sample_rate
+        else:
+            trace_id, parent_id = secrets.token_hex(16), None
+            sampled = random.random() < self.sample_rate
+
+        span = Span(f"HTTP {scope['method']}", trace_id, parent_id, sampled, {
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        })
+        token = _current_span.set(span)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"traceparent", span.traceparent.encode()))
+                headers.append((b"x-trace-id", trace_id.encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                span.name = f"HTTP {scope['method']} {route.path}"
+                span.set_attribute("http.route", route.path)
+            _current_span.reset(token)
+            span.end(error)
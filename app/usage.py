@@ -0,0 +1,165 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterator, Optional, Tuple
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+from .database import SessionLocal, dialect_insert
+from .models import RoomParticipant, UsageRollup, RollupWatermark
+
+WATERMARK_NAME = "usage_rollups"
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# left_at is stamped with the transaction start time, so a row can commit
+# slightly after its timestamp. Only fold rows older than this delay.
+SETTLE_DELAY = timedelta(seconds=60)
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _split_by_day(start: datetime, end: datetime) -> Iterator[Tuple[date, int]]:
+    """Yield (day, seconds) for each UTC day covered by [start, end)."""
+    start, end = _as_utc(start), _as_utc(end)
+    while start < end:
+        next_midnight = datetime.combine(
+            start.date() + timedelta(days=1), time.min, tzinfo=timezone.utc
+        )
+        chunk_end = min(end, next_midnight)
+        yield start.date(), round((chunk_end - start).total_seconds())
+        start = chunk_end
+
+
+def _upsert_rollups(db: Session, rows: list) -> None:
+    """Add rows onto existing rollup buckets in a single statement."""
+    stmt = dialect_insert(db)(UsageRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UsageRollup.day, UsageRollup.room_id, UsageRollup.user_id],
+        set_={
+            "participant_seconds": UsageRollup.participant_seconds + stmt.excluded.participant_seconds,
+            "sessions": UsageRollup.sessions + stmt.excluded.sessions,
+        },
+    )
+    db.execute(stmt)
+
+
+def refresh_usage_rollups(db: Session, batch_size: int = 5000) -> int:
+    """Fold closed participations past the high-water mark into the rollup.
+
+    Each batch and its watermark advance commit together, so a batch is
+    counted exactly once. Returns the number of participations folded.
+    """
+    cutoff = datetime.now(timezone.utc) - SETTLE_DELAY
+    folded = 0
+
+    while True:
+        watermark = db.query(RollupWatermark).filter(
+            RollupWatermark.name == WATERMARK_NAME
+        ).with_for_update().first()
+        if watermark is None:
+            # Several workers may start at once; one insert wins, then lock it
+            db.execute(dialect_insert(db)(RollupWatermark).values(
+                name=WATERMARK_NAME, high_water_mark=EPOCH, last_id=0
+            ).on_conflict_do_nothing())
+            db.commit()
+            continue
+
+        participations = db.execute(
+            select(
+                RoomParticipant.id,
+                RoomParticipant.room_id,
+                RoomParticipant.user_id,
+                RoomParticipant.joined_at,
+                RoomParticipant.left_at,
+            ).where(
+                tuple_(RoomParticipant.left_at, RoomParticipant.id)
+                > tuple_(watermark.high_water_mark, watermark.last_id),
+                RoomParticipant.left_at <= cutoff,
+            ).order_by(
+                RoomParticipant.left_at, RoomParticipant.id
+            ).limit(batch_size)
+        ).all()
+
+        if not participations:
+            db.commit()
+            return folded
+
+        buckets: Dict[Tuple[date, int, int], list] = defaultdict(lambda: [0, 0])
+        for participation in participations:
+            if participation.joined_at is None:
+                continue
+            for day, seconds in _split_by_day(participation.joined_at, participation.left_at):
+                bucket = buckets[(day, participation.room_id, participation.user_id)]
+                bucket[0] += seconds
+            # Count the session once, on the day it started
+            start_day = _as_utc(participation.joined_at).date()
+            buckets[(start_day, participation.room_id, participation.user_id)][1] += 1
+
+        if buckets:
+            _upsert_rollups(db, [
+                {
+                    "day": day,
+                    "room_id": room_id,
+                    "user_id": user_id,
+                    "participant_seconds": seconds,
+                    "sessions": sessions,
+                }
+                for (day, room_id, user_id), (seconds, sessions) in buckets.items()
+            ])
+
+        last = participations[-1]
+        watermark.high_water_mark = last.left_at
+        watermark.last_id = last.id
+        db.commit()
+        folded += len(participations)
+
+        if len(participations) < batch_size:
+            return folded
+
+
+def refresh_usage_rollups_job() -> None:
+    """Background entry point with its own session."""
+    db = SessionLocal()
+    try:
+        refresh_usage_rollups(db)
+    finally:
+        db.close()
+
+
+def usage_stats(db: Session, column, value: int, start: date, end: date) -> dict:
+    """Read per-day usage for one room or user from the rollup table only."""
+    rows = db.query(
+        UsageRollup.day,
+        func.sum(UsageRollup.participant_seconds),
+        func.sum(UsageRollup.sessions),
+    ).filter(
+        column == value,
+        UsageRollup.day >= start,
+        UsageRollup.day <= end,
+    ).group_by(UsageRollup.day).order_by(UsageRollup.day).all()
+
+    days = [
+        {
+            "day": day,
+            "participant_minutes": round((seconds or 0) / 60, 2),
+            "sessions": sessions or 0,
+        }
+        for day, seconds, sessions in rows
+    ]
+    total_seconds = sum(seconds or 0 for _, seconds, _ in rows)
+    return {
+        "start": start,
+        "end": end,
+        "total_participant_minutes": round(total_seconds / 60, 2),
+        "total_sessions": sum(d["sessions"] for d in days),
+        "days": days,
+    }
+
+
+def default_window(start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    """Fill in a missing window with the last 30 days."""
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    return start, end
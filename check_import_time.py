@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Import-time budget for the API.
+
+Imports app.main in a fresh interpreter under `python -X importtime` and
+fails when:
+1. The cumulative import time (best of --runs) is over --budget-ms
+2. A module that should only load on first use shows up at import (the
+   LiveKit SDK, aiohttp, Alembic)
+3. The import touches the database: DATABASE_URL points at a SQLite file in
+   a directory that does not exist, so any connection attempt fails
+4. The import reads the settings (they are built on first use, at startup)
+
+Every worker process pays this on start (and again on each reload), so keep
+heavy SDKs behind first use and database work in the lifespan.
+
+Most of the time is the libraries every request needs: FastAPI, SQLAlchemy,
+pydantic, email-validator and python-jose take about 1.4s together on a
+single-CPU runner, and the app adds about 0.3s on top. The 2000ms default
+leaves room for timing noise there; on a faster machine pass a tighter
+--budget-ms.
+
+Examples:
+    python check_import_time.py
+    python check_import_time.py --budget-ms 800 --runs 5 --top 25
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+TARGET = "app.main"
+
+# Top-level packages that must not be imported by `import app.main`
+DEFERRED_PACKAGES = {"livekit", "aiohttp", "alembic"}
+
+# Exit status of the import when get_settings() already ran
+SETTINGS_READ = 3
+SETTINGS_CHECK = f"import sys, app.config; sys.exit({SETTINGS_READ} if app.config.get_settings.cache_info().currsize else 0)"
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check the import time of app.main.")
+    parser.add_argument("--budget-ms", type=float, default=2000.0, help="Allowed cumulative import time")
+    parser.add_argument("--runs", type=int, default=3, help="Imports to time; the fastest counts")
+    parser.add_argument("--top", type=int, default=15, help="Show this many slowest top-level imports")
+    return parser.parse_args()
+
+
+def import_once() -> list:
+    """Import TARGET in a new interpreter; return (self_us, cumulative_us, depth, module) rows."""
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'no-such-dir', 'import.db')}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {TARGET}; {SETTINGS_CHECK}"],
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode == SETTINGS_READ:
+        print(f"❌ Error: import {TARGET} built the settings; read them on first use instead")
+        sys.exit(1)
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        print(f"❌ Error: import {TARGET} failed")
+        sys.exit(1)
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((int(self_us), int(cumulative_us), (len(indent) - 1) // 2, module))
+    return rows
+
+
+def main():
+    args = parse_args()
+    runs = [import_once() for _ in range(args.runs)]
+
+    def total(rows):
+        return next(cumulative for _, cumulative, _, module in rows if module == TARGET)
+
+    best = min(runs, key=total)
+    total_ms = total(best) / 1000
+
+    print(f"\n📦 Slowest imports under {TARGET} (best of {args.runs})")
+    # -X importtime lists a module after everything it imported
+    end = next(index for index, row in enumerate(best) if row[3] == TARGET)
+    start = end
+    while start > 0 and best[start - 1][2] > 0:
+        start -= 1
+    children = [row for row in best[start:end] if row[2] == 1]
+    for _, cumulative, _, module in sorted(children, reverse=True, key=lambda row: row[1])[:args.top]:
+        print(f"   {cumulative / 1000:>8.1f}ms  {module}")
+
+    problems = []
+    if total_ms > args.budget_ms:
+        problems.append(f"import took {total_ms:.0f}ms, budget is {args.budget_ms:.0f}ms")
+    imported = {module.split(".")[0] for _, _, _, module in best}
+    for package in sorted(DEFERRED_PACKAGES & imported):
+        problems.append(f"{package} is imported eagerly")
+
+    print(f"\n⏱️  import {TARGET}: {total_ms:.0f}ms (budget {args.budget_ms:.0f}ms)")
+    if problems:
+        for problem in problems:
+            print(f"   ❌ {problem}")
+        sys.exit(1)
+    print("   ✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Seeding and load-generation tool for the LiveKit backend.
+
+Builds on setup_default_data.py, but drives the API concurrently:
+1. Registers N users and creates M rooms (seed phase)
+2. Ramps up one virtual user per account; each logs in, lists rooms and
+   joins its share of rooms, pausing for a think time between calls
+3. Reports latency percentiles per endpoint
+
+Examples:
+    python load_test.py --users 200 --rooms 20 --joins-per-room 10
+    python load_test.py --launch --database-url sqlite:///./load.db --ramp linear --ramp-seconds 30
+    python load_test.py --launch --fake-livekit --fake-latency-ms 25 --fake-error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from app.fake_livekit import FakeLiveKitConfig, FakeLiveKitServer
+
+DEFAULT_BASE_URL = "http://localhost:8000"
+PASSWORD = "loadtest-password"
+
+# Endpoint labels used in the report (path templates, not concrete URLs)
+LOGIN = "POST /auth/login"
+REGISTER = "POST /auth/register"
+LIST_ROOMS = "GET /rooms/"
+CREATE_ROOM = "POST /rooms/"
+JOIN_ROOM = "POST /rooms/{id}/join"
+ROOM_PARTICIPANTS = "GET /rooms/{id}/participants"
+
+
+class Stats:
+    """Collects per-endpoint latencies and error counts."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, seconds, status):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+        if status >= 400:
+            self.errors[endpoint] += 1
+
+    @staticmethod
+    def percentile(values, pct):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def summary(self):
+        result = {}
+        for endpoint, values in self.latencies.items():
+            result[endpoint] = {
+                "count": len(values),
+                "errors": self.errors[endpoint],
+                "statuses": dict(self.statuses[endpoint]),
+                **{
+                    f"p{pct}_ms": round(self.percentile(values, pct) * 1000, 2)
+                    for pct in (50, 90, 95, 99)
+                },
+                "max_ms": round(max(values) * 1000, 2),
+            }
+        return result
+
+
+async def timed(stats, client, endpoint, method, url, **kwargs):
+    """Make a request and record its latency under the endpoint label."""
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        status = response.status_code
+    except httpx.HTTPError:
+        response, status = None, 599
+    stats.record(endpoint, time.perf_counter() - start, status)
+    return response
+
+
+async def think(args):
+    """Pause like a real client would between calls."""
+    if args.think_ms > 0:
+        await asyncio.sleep(random.expovariate(1 / args.think_ms) / 1000)
+
+
+def ramp_delay(args, index):
+    """Start offset (seconds) for the index-th virtual user."""
+    if args.ramp == "constant" or args.ramp_seconds <= 0:
+        return 0.0
+    fraction = index / max(1, args.users)
+    if args.ramp == "step":
+        step = int(fraction * args.ramp_steps)
+        return step * args.ramp_seconds / args.ramp_steps
+    return fraction * args.ramp_seconds
+
+
+async def login(stats, client, username):
+    response = await timed(
+        stats, client, LOGIN, "POST", "/auth/login",
+        data={"username": username, "password": PASSWORD},
+    )
+    if response is None or response.status_code != 200:
+        return None
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def seed(args, stats, client, limiter):
+    """Register users and create rooms. Returns (usernames, room ids)."""
+    usernames = [f"{args.user_prefix}_{i}" for i in range(args.users)]
+
+    async def register(username):
+        async with limiter:
+            await timed(
+                stats, client, REGISTER, "POST", "/auth/register",
+                json={
+                    "username": username,
+                    "email": f"{username}@loadtest.example.com",
+                    "password": PASSWORD,
+                    "full_name": username,
+                },
+            )
+
+    await asyncio.gather(*(register(username) for username in usernames))
+
+    async def create_room(index):
+        async with limiter:
+            headers = await login(stats, client, usernames[index % len(usernames)])
+            if headers is None:
+                return None
+            response = await timed(
+                stats, client, CREATE_ROOM, "POST", "/rooms/",
+                json={"name": f"{args.user_prefix} room {index}", "max_participants": args.joins_per_room},
+                headers=headers,
+            )
+            if response is None or response.status_code != 200:
+                return None
+            return response.json()["id"]
+
+    room_ids = await asyncio.gather(*(create_room(i) for i in range(args.rooms)))
+    return usernames, [room_id for room_id in room_ids if room_id is not None]
+
+
+async def virtual_user(args, stats, client, limiter, index, username, room_ids):
+    """Log in, list rooms, then join every assigned room and list its participants."""
+    await asyncio.sleep(ramp_delay(args, index))
+    async with limiter:
+        headers = await login(stats, client, username)
+    if headers is None:
+        return
+
+    await think(args)
+    async with limiter:
+        await timed(stats, client, LIST_ROOMS, "GET", "/rooms/", headers=headers)
+
+    for room_id in room_ids:
+        await think(args)
+        async with limiter:
+            await timed(stats, client, JOIN_ROOM, "POST", f"/rooms/{room_id}/join", headers=headers)
+        await think(args)
+        async with limiter:
+            await timed(stats, client, ROOM_PARTICIPANTS, "GET", f"/rooms/{room_id}/participants", headers=headers)
+
+
+def assign_joins(args, usernames, room_ids):
+    """Spread joins_per_room joins for every room across the users."""
+    assignments = defaultdict(list)
+    slot = 0
+    for room_id in room_ids:
+        for _ in range(args.joins_per_room):
+            assignments[usernames[slot % len(usernames)]].append(room_id)
+            slot += 1
+    return assignments
+
+
+def start_fake_livekit(args):
+    """Run a fake LiveKit in this process and point the launched app at it."""
+    config = FakeLiveKitConfig(
+        api_key="loadtest",
+        api_secret=f"loadtest-{random.getrandbits(128):032x}",
+        port=0,
+        latency_ms=args.fake_latency_ms,
+        jitter_ms=args.fake_jitter_ms,
+        error_rate=args.fake_error_rate,
+        churn_interval=args.fake_churn_interval,
+        seed=args.seed,
+    )
+    server = FakeLiveKitServer(config).start()
+    print(f"🎭 Fake LiveKit running on {server.url}")
+    return server
+
+
+def launch_app(args, fake_livekit=None):
+    """Start the API locally with uvicorn, pointed at the given database and LiveKit."""
+    env = dict(os.environ)
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    if args.livekit_url:
+        env["LIVEKIT_URL"] = args.livekit_url
+    if fake_livekit is not None:
+        env["LIVEKIT_URL"] = fake_livekit.url
+        env["LIVEKIT_API_KEY"] = fake_livekit.config.api_key
+        env["LIVEKIT_API_SECRET"] = fake_livekit.config.api_secret
+    # Every virtual user logs in from this host; keep the per-IP buckets out of the way
+    env.setdefault("LOGIN_RATE_PER_IP", "0")
+    env.setdefault("REGISTER_RATE_PER_IP", "0")
+    port = args.base_url.rsplit(":", 1)[-1].strip("/")
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    # The app never creates tables itself; make sure a scratch database has them
+    # (created from the models, so there is no Alembic revision to check)
+    env.setdefault("SCHEMA_CHECK", "off")
+    subprocess.run(
+        [sys.executable, "-c", "from app.database import create_schema; create_schema()"],
+        env=env,
+        cwd=cwd,
+        check=True,
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", port, "--log-level", "warning"],
+        env=env,
+        cwd=cwd,
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            print("❌ Error: The app exited during startup")
+            sys.exit(1)
+        try:
+            if httpx.get(f"{args.base_url}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+
+    process.terminate()
+    print("❌ Error: The app did not become healthy within 30 seconds")
+    sys.exit(1)
+
+
+async def run(args):
+    stats = Stats()
+    limiter = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        print(f"🌱 Seeding {args.users} users and {args.rooms} rooms...")
+        usernames, room_ids = await seed(args, stats, client, limiter)
+        if not room_ids:
+            print("❌ Error: No rooms could be created")
+            return stats, 0.0
+
+        assignments = assign_joins(args, usernames, room_ids)
+        print(f"🚀 Running {len(usernames)} virtual users ({args.ramp} ramp over {args.ramp_seconds}s)...")
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            virtual_user(args, stats, client, limiter, index, username, assignments[username])
+            for index, username in enumerate(usernames)
+        ))
+        return stats, time.perf_counter() - start
+
+
+def print_report(summary, elapsed):
+    print(f"\n📊 Results (load phase {elapsed:.1f}s)")
+    print(f"   {'endpoint':<30} {'count':>7} {'errors':>7} {'p50':>9} {'p90':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for endpoint, row in summary.items():
+        print(
+            f"   {endpoint:<30} {row['count']:>7} {row['errors']:>7} "
+            f"{row['p50_ms']:>7.1f}ms {row['p90_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms "
+            f"{row['p99_ms']:>7.1f}ms {row['max_ms']:>7.1f}ms"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed data and generate load against the API.")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--joins-per-room", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=20, help="Maximum in-flight requests")
+    parser.add_argument("--ramp", choices=["constant", "linear", "step"], default="linear")
+    parser.add_argument("--ramp-seconds", type=float, default=10.0)
+    parser.add_argument("--ramp-steps", type=int, default=5, help="Number of steps for --ramp step")
+    parser.add_argument("--think-ms", type=float, default=100.0, help="Mean think time between calls (0 disables)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--user-prefix", default="loadtest")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible think times")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    parser.add_argument("--launch", action="store_true", help="Start the app locally for the run")
+    parser.add_argument("--database-url", help="DATABASE_URL for the launched app")
+    parser.add_argument("--livekit-url", help="LIVEKIT_URL for the launched app")
+    parser.add_argument("--fake-livekit", action="store_true", help="Back the launched app with an in-process fake LiveKit")
+    parser.add_argument("--fake-latency-ms", type=float, default=0.0)
+    parser.add_argument("--fake-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--fake-error-rate", type=float, default=0.0)
+    parser.add_argument("--fake-churn-interval", type=float, default=0.0)
+    args = parser.parse_args()
+    if args.fake_livekit and not args.launch:
+        parser.error("--fake-livekit requires --launch")
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    fake_livekit = start_fake_livekit(args) if args.fake_livekit else None
+    process = launch_app(args, fake_livekit) if args.launch else None
+    try:
+        stats, elapsed = asyncio.run(run(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if fake_livekit is not None:
+            fake_livekit.stop()
+
+    summary = stats.summary()
+    print_report(summary, elapsed)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"elapsed_seconds": elapsed, "endpoints": summary}, f, indent=2)
+        print(f"\n💾 Report saved to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the per-request hot paths.
+
+Covers JWT minting/verification, LiveKit token minting, bcrypt verification
+and serializing room and user responses, both through FastAPI's
+response_model path (serialize.*) and through the orjson fast path the read
+routes use (serialize.*_fast). The route.* benchmarks call read routes
+in-process (auth, query, serialization and middleware) against a seeded
+in-memory SQLite database, so they need no PostgreSQL. Each benchmark is calibrated so one round
+takes at least --min-round-ms, then timed over --rounds rounds with the GC
+disabled; the median per-call time is compared against a stored baseline.
+
+Examples:
+    python run_benchmarks.py --save-baseline          # record .benchmarks/baseline.json
+    python run_benchmarks.py                          # compare, exit 1 on a >10% regression
+    python run_benchmarks.py --only token --threshold 0.05 --json bench.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from fastapi.utils import create_response_field
+
+from app.auth import create_access_token, get_password_hash, verify_password, verify_token
+from app.database import SessionLocal, use_database
+from app.main import app
+from app.livekit_service import livekit_service
+from app.models import Room, RoomParticipant, User
+from app.routers.rooms import room_encoder
+from app.routers.users import user_encoder
+from app.schemas import RoomWithParticipants, User as UserSchema
+from app.revocation import RevocationList, revocations
+from app.serialization import json_response
+
+DEFAULT_BASELINE = os.path.join(".benchmarks", "baseline.json")
+PASSWORD = "benchmark-password"
+
+
+# Fixtures
+
+def make_user(index: int) -> User:
+    return User(
+        id=index,
+        username=f"bench_user_{index}",
+        email=f"bench_user_{index}@example.com",
+        full_name=f"Bench User {index}",
+        hashed_password="x",
+        is_active=True,
+        created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+def make_rooms(count: int):
+    rows = []
+    for index in range(count):
+        creator = make_user(index)
+        room = Room(
+            id=index,
+            name=f"Bench Room {index}",
+            room_id=f"room_{index:08x}",
+            description="A room used for benchmarking response serialization",
+            creator_id=creator.id,
+            is_active=True,
+            max_participants=50,
+            created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        )
+        rows.append((room, index % 7, creator))
+    return rows
+
+
+def route_client(rooms: int = 20, participants_per_room: int = 3):
+    """TestClient (no lifespan, so no background jobs) over a fresh seeded in-memory database."""
+    use_database()
+    db = SessionLocal()
+    try:
+        users = [
+            User(username=f"bench_user_{index}", email=f"bench_user_{index}@example.com", hashed_password="x")
+            for index in range(participants_per_room + 1)
+        ]
+        db.add_all(users)
+        db.flush()
+        room_rows = [
+            Room(name=f"Bench Room {index}", room_id=f"room_{index:08x}", creator_id=users[0].id)
+            for index in range(rooms)
+        ]
+        db.add_all(room_rows)
+        db.flush()
+        db.add_all(
+            RoomParticipant(room_id=room.id, user_id=user.id, is_connected=True)
+            for room in room_rows
+            for user in users[1:]
+        )
+        db.commit()
+        token = create_access_token(data={"sub": users[0].username, "uid": users[0].id})
+        # Done by the lifespan otherwise; until then authentication answers 503
+        revocations.refresh(db)
+    finally:
+        db.close()
+    client, headers = TestClient(app), {"Authorization": f"Bearer {token}"}
+    response = client.get("/auth/me", headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError(f"route benchmarks: /auth/me returned {response.status_code}")
+    return client, headers
+
+
+def serialize(field, content) -> bytes:
+    """What FastAPI does with a response_model: validate, serialize, json.dumps."""
+    value, errors = field.validate(content, {}, loc=("response",))
+    if errors:
+        raise ValueError(errors)
+    return JSONResponse(field.serialize(value, mode="json")).body
+
+
+def build_benchmarks():
+    token = create_access_token(data={"sub": "bench_user_0", "uid": 0})
+    # Auth-path revocation check against a list of 10k revoked tokens and 100 revoked users
+    revoked = RevocationList()
+    revoked.jtis = {f"{index:032x}": 2 ** 40 for index in range(10000)}
+    revoked.users = {index: (0, 2 ** 40) for index in range(1, 101)}
+    live_jti = "f" * 32
+    hashed_password = get_password_hash(PASSWORD)
+    room_rows = make_rooms(100)
+    users = [make_user(index) for index in range(100)]
+    rooms_field = create_response_field("Response", List[RoomWithParticipants])
+    room_field = create_response_field("Response", RoomWithParticipants)
+    user_field = create_response_field("Response", UserSchema)
+    users_field = create_response_field("Response", List[UserSchema])
+
+    client, headers = route_client()
+
+    def build_room(room, participants_count, creator):
+        return RoomWithParticipants(**room.__dict__, participants_count=participants_count, creator=creator)
+
+    return {
+        "token.create_access_token": lambda: create_access_token(data={"sub": "bench_user_0", "uid": 0}),
+        "token.verify_token": lambda: verify_token(token),
+        "token.revocation_check": lambda: revoked.is_revoked(live_jti, 0, 1),
+        "token.livekit_generate_access_token": lambda: livekit_service.generate_access_token(
+            room_name="room_00000000", participant_name="bench_user_0"
+        ),
+        "auth.verify_password": lambda: verify_password(PASSWORD, hashed_password),
+        "serialize.room": lambda: serialize(room_field, build_room(*room_rows[0])),
+        "serialize.rooms_page_100": lambda: serialize(rooms_field, [build_room(*row) for row in room_rows]),
+        "serialize.user": lambda: serialize(user_field, users[0]),
+        "serialize.users_page_100": lambda: serialize(users_field, users),
+        # What the routers actually do: schema encoder + orjson, no response validation
+        "serialize.rooms_page_100_fast": lambda: json_response([
+            room_encoder.to_dict(room, participants_count=participants_count, creator=creator)
+            for room, participants_count, creator in room_rows
+        ]).body,
+        "serialize.users_page_100_fast": lambda: json_response(user_encoder.to_dicts(users)).body,
+        "route.auth_me": lambda: client.get("/auth/me", headers=headers).content,
+        "route.list_rooms_20": lambda: client.get("/rooms/?limit=20", headers=headers).content,
+        "route.search_rooms": lambda: client.get("/rooms/search?q=bench", headers=headers).content,
+    }
+
+
+# Timing
+
+def calibrate(func, min_round_seconds: float) -> int:
+    """Smallest power-of-two iteration count whose round takes min_round_seconds."""
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        if time.perf_counter() - start >= min_round_seconds or iterations >= 1 << 20:
+            return iterations
+        iterations *= 2
+
+
+def measure(func, rounds: int, min_round_seconds: float) -> dict:
+    func()  # warm up caches and lazy imports
+    iterations = calibrate(func, min_round_seconds)
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            timings.append((time.perf_counter() - start) / iterations)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return {
+        "iterations": iterations,
+        "rounds": rounds,
+        "min_us": min(timings) * 1e6,
+        "median_us": statistics.median(timings) * 1e6,
+        "mean_us": statistics.fmean(timings) * 1e6,
+        "stddev_us": statistics.stdev(timings) * 1e6 if len(timings) > 1 else 0.0,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Print a comparison table; return the names that regressed past threshold."""
+    regressions = []
+    print(f"\n📊 Benchmarks (median per call, threshold +{threshold:.0%})")
+    print(f"   {'benchmark':<38} {'median':>12} {'baseline':>12} {'change':>9}")
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"   🆕 {name:<35} {result['median_us']:>10.2f}us {'-':>12} {'-':>9}")
+            continue
+        change = result["median_us"] / previous["median_us"] - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        marker = "❌" if regressed else ("🚀" if change < -threshold else "✅")
+        print(
+            f"   {marker} {name:<35} {result['median_us']:>10.2f}us "
+            f"{previous['median_us']:>10.2f}us {change:>+8.1%}"
+        )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run hot-path micro-benchmarks and compare with a baseline.")
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this text")
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--min-round-ms", type=float, default=50.0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed median slowdown (0.10 = 10%%)")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    benchmarks = build_benchmarks()
+    if args.only:
+        benchmarks = {name: func for name, func in benchmarks.items() if args.only in name}
+
+    results = {}
+    for name, func in benchmarks.items():
+        print(f"⏱️  {name}...")
+        results[name] = measure(func, args.rounds, args.min_round_ms / 1000)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["benchmarks"]
+    regressions = compare(results, baseline, args.threshold)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "benchmarks": results,
+    }
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results saved to {args.json_path}")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        # Keep baselines of benchmarks that were not run this time
+        report["benchmarks"] = {**baseline, **results}
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+
+# An in-memory database per test; no background jobs or schema check
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["SCHEMA_CHECK"] = "off"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("LIVEKIT_URL", "ws://127.0.0.1:1")
+os.environ.setdefault("LIVEKIT_API_KEY", "devkey")
+os.environ.setdefault("LIVEKIT_API_SECRET", "test-livekit-secret-of-32-bytes-or-more")
+
+import pytest  # noqa: E402
+
+from app.auth import create_access_token  # noqa: E402
+from app.database import SessionLocal, use_database  # noqa: E402
+from app.models import Room, User  # noqa: E402
+from app.revocation import revocations  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    use_database()
+    session = SessionLocal()
+    # Forget the previous test's revocations; load this database's (none)
+    revocations.__init__()
+    revocations.refresh(session)
+    session.close()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def seeded(db):
+    """A user, an auth header for them and one of their rooms."""
+    user = User(username="alice", email="alice@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    room = Room(name="Standup", room_id="room_standup", creator_id=user.id)
+    db.add(room)
+    db.commit()
+    token = create_access_token(data={"sub": user.username, "uid": user.id})
+    seeded = {"headers": {"Authorization": f"Bearer {token}"}, "user_id": user.id, "room_id": room.id}
+    db.close()
+    return seeded
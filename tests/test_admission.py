@@ -0,0 +1,17 @@
+from app.admission import AdaptiveLimiter
+
+
+def test_limit_recovers_after_a_lasting_slowdown():
+    limiter = AdaptiveLimiter(max_limit=8, tolerance=2.0)
+    for _ in range(20):
+        limiter.observe(0.1)
+    assert limiter.limit == 8
+
+    # Hashing becomes four times slower for good
+    for _ in range(20):
+        limiter.observe(0.4)
+    assert limiter.limit < 4
+
+    for _ in range(1000):
+        limiter.observe(0.4)
+    assert limiter.limit == 8
@@ -0,0 +1,22 @@
+import io
+
+from app import bulk_import
+from app.models import User
+
+
+def test_only_rows_that_conflict_are_rejected(db, monkeypatch):
+    def hash_and_race(passwords):
+        # Registered after the batch was checked, before it is inserted
+        db.add(User(username="bob", email="bob@elsewhere.com", hashed_password="x"))
+        db.commit()
+        return ["hashed"] * len(passwords)
+
+    monkeypatch.setattr(bulk_import, "_hash_passwords", hash_and_race)
+    csv = "username,email,password\nann,ann@example.com,pw\nbob,bob@example.com,pw\ncat,cat@example.com,pw\n"
+    report = bulk_import.import_users_csv(db, io.StringIO(csv))
+
+    assert report["created"] == 2
+    assert report["errors"] == [
+        {"row": 3, "username": "bob", "error": "Conflicts with a concurrently created user"}
+    ]
+    assert {user.username for user in db.query(User)} == {"ann", "bob", "cat"}
@@ -0,0 +1,49 @@
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi.testclient import TestClient
+
+from app import idempotency
+from app.main import app
+from app.models import IdempotencyKey, RoomParticipant
+
+client = TestClient(app)
+
+
+def test_join_replay_mints_a_new_token(db, seeded):
+    headers = dict(seeded["headers"], **{"Idempotency-Key": "join-1"})
+    first = client.post(f"/rooms/{seeded['room_id']}/join", headers=headers)
+    time.sleep(1)  # LiveKit tokens are stamped in whole seconds
+    retry = client.post(f"/rooms/{seeded['room_id']}/join", headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["token"] != first.json()["token"]
+    assert db.query(RoomParticipant).count() == 1
+    stored = db.query(IdempotencyKey).one()
+    assert first.json()["token"].encode() not in stored.response_body
+
+
+def test_cache_survives_concurrent_eviction(monkeypatch):
+    monkeypatch.setattr(idempotency, "_responses", OrderedDict())
+    monkeypatch.setattr(idempotency.settings, "idempotency_cache_size", 8)
+    expires_at = int(time.time()) + 60
+    errors = []
+
+    def churn(offset):
+        try:
+            for index in range(5000):
+                key = (offset, str(index % 16))
+                idempotency._remember(key, ("hash", 200, b"{}", expires_at))
+                idempotency._cached(key, int(time.time()))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=churn, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(idempotency._responses) <= 8
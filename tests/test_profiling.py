@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import time
+
+from app.profiling import LOOP_ROOT, REQUEST_ROOT, ProfileStore, ProfilerMiddleware, RequestProfiler
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def roots(profiler):
+    return {stack.split(";", 1)[0] for stack in profiler.samples}
+
+
+def test_loop_samples_are_attributed_to_the_request_task():
+    async def other():
+        busy(0.1)
+
+    async def request():
+        profiler = RequestProfiler(threading.get_ident(), 0.001, asyncio.current_task())
+        profiler.start()
+        busy(0.1)
+        await asyncio.create_task(other())
+        profiler.stop()
+        return profiler
+
+    profiler = asyncio.run(request())
+    assert roots(profiler) == {REQUEST_ROOT, LOOP_ROOT}
+    assert any(stack.startswith(f"{REQUEST_ROOT};") and "busy" in stack for stack in profiler.samples)
+
+
+def test_middleware_saves_profiles_for_the_token_only(tmp_path):
+    store = ProfileStore(str(tmp_path), max_files=10)
+    sent = []
+
+    async def app(scope, receive, send):
+        busy(0.02)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = ProfilerMiddleware(app, store=store, token="secret")
+    for header in (b"wrong", b"secret"):
+        scope = {"type": "http", "method": "GET", "path": "/rooms/", "headers": [(b"x-profile", header)]}
+        asyncio.run(middleware(scope, None, send))
+
+    assert [dict(message["headers"]).get(b"x-profile-id") is not None for message in sent] == [False, True]
+    assert len(store.list()) == 1
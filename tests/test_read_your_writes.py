@@ -0,0 +1,26 @@
+from fastapi.testclient import TestClient
+
+from app import database
+from app.database import Base, READ_YOUR_WRITES_COOKIE
+from app.main import app
+
+
+def test_write_marker_travels_with_the_client(monkeypatch, seeded):
+    # An empty replica that hasn't caught up with anything
+    replica = database._create_engine("sqlite://", "replica")
+    Base.metadata.create_all(bind=replica)
+    monkeypatch.setitem(database._engines, "replica", replica)
+    database._recent_writers.clear()
+    headers = seeded["headers"]
+
+    client = TestClient(app)
+    assert client.get("/rooms/", headers=headers).json() == []
+
+    assert client.post(f"/rooms/{seeded['room_id']}/join", headers=headers).status_code == 200
+    assert READ_YOUR_WRITES_COOKIE in client.cookies
+    # As if the next request reached another worker
+    database._recent_writers.clear()
+    assert [room["id"] for room in client.get("/rooms/", headers=headers).json()] == [seeded["room_id"]]
+
+    client.cookies.clear()
+    assert client.get("/rooms/", headers=headers).json() == []
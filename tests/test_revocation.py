@@ -0,0 +1,54 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.main import app
+from app.models import RevokedToken, User
+from app.revocation import revocations
+
+client = TestClient(app)
+
+
+def test_legacy_token_logout_is_revoked(db, seeded):
+    # Issued before tokens carried a user id
+    token = create_access_token(data={"sub": "alice"})
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    assert client.get("/auth/me", headers=headers).status_code == 401
+
+
+def test_deactivation_revokes_tokens(db, seeded):
+    admin = User(username="root", email="root@example.com", hashed_password="x", is_admin=True)
+    db.add(admin)
+    db.commit()
+    admin_headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'root', 'uid': admin.id})}"}
+    # The in-memory database has one connection; let the app have it
+    db.close()
+
+    response = client.post(f"/admin/users/{seeded['user_id']}/deactivate", headers=admin_headers)
+    assert response.status_code == 200
+    db.expire_all()
+    assert not db.get(User, seeded["user_id"]).is_active
+    assert db.query(RevokedToken).filter(RevokedToken.user_id == seeded["user_id"]).count() == 1
+    assert client.get("/rooms/", headers=seeded["headers"]).status_code == 401
+
+
+def test_unloaded_revocations_reject_tokens(db, seeded):
+    revocations.loaded = False
+    response = client.get("/rooms/", headers=seeded["headers"])
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+def test_refresh_picks_up_late_commits(db, seeded):
+    now = int(time.time())
+    db.add(RevokedToken(jti="newer", user_id=seeded["user_id"], revoked_at=now, expires_at=now + 60))
+    db.commit()
+    revocations.refresh(db)
+
+    # Committed after "newer" was read, though revoked a little earlier
+    db.add(RevokedToken(jti="older", user_id=seeded["user_id"], revoked_at=now - 5, expires_at=now + 60))
+    db.commit()
+    revocations.refresh(db)
+    assert revocations.is_revoked("older", seeded["user_id"], now)
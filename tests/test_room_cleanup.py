@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta, timezone
+
+from app.models import Room, RoomParticipant
+from app.room_cleanup import close_dangling_participants
+
+
+def test_dangling_participants_leave_now(db, seeded):
+    # A room deleted long ago that still has a connected participant
+    room = db.get(Room, seeded["room_id"])
+    room.is_active = False
+    room.updated_at = datetime.now(timezone.utc) - timedelta(days=3)
+    db.add(RoomParticipant(room_id=room.id, user_id=seeded["user_id"], is_connected=True))
+    db.commit()
+
+    before = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    assert close_dangling_participants(db) == 1
+
+    participant = db.query(RoomParticipant).one()
+    assert not participant.is_connected
+    # Not back-dated behind the usage rollup's watermark
+    assert participant.left_at.replace(tzinfo=None) >= before
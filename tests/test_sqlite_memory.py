@@ -0,0 +1,63 @@
+"""Concurrent requests against the shared in-memory SQLite connection.
+
+Every session takes turns on the one connection, so a handler that held it
+across an await (or took it on the event loop) would stall the others.
+"""
+
+import asyncio
+import time
+
+import httpx
+
+from app.livekit_service import livekit_service
+from app.main import app
+
+LIVEKIT_DELAY_SECONDS = 0.3
+
+
+def run_concurrently(monkeypatch, requests):
+    async def slow_participants(room_name):
+        await asyncio.sleep(LIVEKIT_DELAY_SECONDS)
+        return []
+
+    async def slow_delete(room_name):
+        await asyncio.sleep(LIVEKIT_DELAY_SECONDS)
+        return True
+
+    monkeypatch.setattr(livekit_service, "get_room_participants", slow_participants)
+    monkeypatch.setattr(livekit_service, "delete_room", slow_delete)
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.request(method, path, headers=headers) for method, path, headers in requests))
+
+    start = time.perf_counter()
+    responses = asyncio.run(main())
+    return responses, time.perf_counter() - start
+
+
+def test_participants_do_not_hold_the_connection(monkeypatch, seeded):
+    request = ("GET", f"/rooms/{seeded['room_id']}/participants", seeded["headers"])
+    responses, elapsed = run_concurrently(monkeypatch, [request] * 5)
+    assert [response.status_code for response in responses] == [200] * 5
+    # The LiveKit calls overlap instead of queueing behind the connection
+    assert elapsed < 3 * LIVEKIT_DELAY_SECONDS
+
+
+def test_lobby_and_reads_during_livekit_calls(monkeypatch, seeded):
+    headers = seeded["headers"]
+    requests = [("GET", "/lobby?include_participants=true", headers)] * 3
+    requests += [("GET", "/rooms/", headers), ("GET", f"/rooms/{seeded['room_id']}", headers)]
+    responses, elapsed = run_concurrently(monkeypatch, requests)
+    assert [response.status_code for response in responses] == [200] * 5
+    assert elapsed < 3 * LIVEKIT_DELAY_SECONDS
+
+
+def test_delete_room_while_others_read(monkeypatch, seeded):
+    headers = seeded["headers"]
+    requests = [("DELETE", f"/rooms/{seeded['room_id']}", headers)]
+    requests += [("GET", f"/rooms/{seeded['room_id']}/participants", headers)] * 3
+    responses, elapsed = run_concurrently(monkeypatch, requests)
+    assert [response.status_code for response in responses] == [200] * 4
+    assert elapsed < 3 * LIVEKIT_DELAY_SECONDS
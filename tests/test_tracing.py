@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+from app.tracing import Span, SpanExporter, TracingMiddleware, _current_span
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+SAMPLED_PARENT = f"00-{TRACE_ID}-00f067aa0ba902b7-01".encode()
+
+
+def root_span(middleware_kwargs, client):
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["span"] = _current_span.get()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/", "client": (client, 1234),
+             "headers": [(b"traceparent", SAMPLED_PARENT)]}
+    asyncio.run(TracingMiddleware(app, **middleware_kwargs)(scope, None, send))
+    return seen["span"]
+
+
+def test_untrusted_sampled_parent_is_not_forced():
+    span = root_span({}, "203.0.113.9")
+    assert span.trace_id == TRACE_ID
+    assert not span.sampled
+
+
+def test_trusted_sampled_parent_is_honoured():
+    span = root_span({"trusted_parents": "10.0.0.0/8"}, "10.1.2.3")
+    assert span.sampled
+    assert not root_span({"trusted_parents": "10.0.0.0/8"}, "203.0.113.9").sampled
+
+
+def test_export_file_is_rotated(tmp_path):
+    path = str(tmp_path / "spans.jsonl")
+    exporter = SpanExporter(path=path, max_bytes=200)
+    for _ in range(5):
+        span = Span("x", TRACE_ID, None, True)
+        span.end_ns = span.start_ns
+        exporter._write([span])
+    exporter.shutdown()
+    assert len(open(path).read().splitlines()) == 1
+    json.loads(open(path + ".1").read())